@@ -2,45 +2,79 @@
 
 import asyncio
 import os
-from pathlib import Path
+import re
+from time import monotonic, time
 import typing
+from urllib.parse import unquote
 
 from homeassistant.components import webhook
 import homeassistant.const as hac
 from homeassistant.core import callback
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.importlib import async_import_module
 from homeassistant.helpers.network import get_url
 from homeassistant.util import raise_if_invalid_path
+from yarl import URL
 
 # forward import since async_setup_entry complains about importing module in main loop
-from .alarm_control_panel import MotionFrontendAlarmControlPanel
+# (the camera is needed by the client camera factory while the other platforms
+# are loaded by HA itself when forwarding the entry)
+from . import udp_events
 from .camera import MotionFrontendCamera
 from .const import (
+    CONF_EVENT_UDP_PORT,
+    CONF_EVENT_UDP_SECRET,
     CONF_MEDIASOURCE,
     CONF_OPTION_AUTO,
+    CONF_OPTION_CAMERA,
     CONF_OPTION_CLOUD,
     CONF_OPTION_DEFAULT,
     CONF_OPTION_EXTERNAL,
     CONF_OPTION_FORCE,
     CONF_OPTION_INTERNAL,
     CONF_OPTION_NONE,
+    CONF_OPTION_RETENTION,
+    CONF_RETENTION_CAMERAS,
+    CONF_RETENTION_MAX_AGE,
+    CONF_RETENTION_MAX_SIZE,
+    CONF_SNAPSHOT_CACHE_SIZE,
+    CONF_SNAPSHOT_CACHE_SIZE_DEFAULT,
+    CONF_SNAPSHOT_FORMAT,
+    CONF_SNAPSHOT_PREFETCH,
+    CONF_SNAPSHOT_PREFETCH_DEFAULT,
+    CONF_SNAPSHOT_QUALITY,
+    CONF_SNAPSHOT_TTL,
+    CONF_SNAPSHOT_TTL_DEFAULT,
+    CONF_STATE_WRITE_DELAY,
+    CONF_STREAM_MAX_FPS,
     CONF_TLS_MODE,
     CONF_WEBHOOK_ADDRESS,
     CONF_WEBHOOK_MODE,
     DOMAIN,
+    EXTRA_ATTR_EVENT_ID,
     EXTRA_ATTR_FILENAME,
     MANAGED_EVENTS,
     MAP_TLS_MODE,
     PLATFORMS,
 )
 from .helpers import LOGGER
+from .image_cache import ImageCache, ImageDiskStore
+from .image_transform import IMAGE_FORMAT_JPEG, ImageTransformer, shutdown_executor
 from .motionclient import (
     MotionHttpClient,
     MotionHttpClientError,
     TlsMode,
     config_schema as cs,
 )
+from .recording_catalog import (
+    CATALOG_EVENTS,
+    RECONCILE_INTERVAL,
+    RecordingCatalog,
+    scan_recordings,
+)
+from .retention import RetentionManager
 
 if typing.TYPE_CHECKING:
     from types import MappingProxyType
@@ -50,6 +84,9 @@ if typing.TYPE_CHECKING:
     from homeassistant.core import CALLBACK_TYPE, HomeAssistant
     from homeassistant.helpers.device_registry import DeviceInfo
 
+    from .alarm_control_panel import MotionFrontendAlarmControlPanel
+    from .media_index import MediaIndex
+
 
 class MotionFrontendApi(MotionHttpClient):
     cameras: dict[str, MotionFrontendCamera]
@@ -61,9 +98,41 @@ class MotionFrontendApi(MotionHttpClient):
         self.config_data = data
         self.webhook_id: str | None = None
         self.webhook_url: str | None = None
+        self.udp_transport: "asyncio.DatagramTransport | None" = None
         self.media_dir_id: str | None = None
+        # precomputed for the webhook filename mapping (target_dir -> media_dir_id)
+        self.target_dir_prefix = ""
+        self.media_dir_prefix = ""
+        self.media_index: "MediaIndex | None" = None
+        self.catalog: RecordingCatalog | None = None
+        self.retention: RetentionManager | None = None
         self.unsub_entry_update_listener: CALLBACK_TYPE | None = None
-        self.alarm_control_panel: MotionFrontendAlarmControlPanel | None = None
+        self.unsub_catalog_reconcile: CALLBACK_TYPE | None = None
+        self.catalog_reconcile: asyncio.Task | None = None
+        self.alarm_control_panel: "MotionFrontendAlarmControlPanel | None" = None
+        camera_options = data.get(CONF_OPTION_CAMERA, {})
+        self.snapshot_ttl: float = camera_options.get(
+            CONF_SNAPSHOT_TTL, CONF_SNAPSHOT_TTL_DEFAULT
+        )
+        # shared among all of the cameras so the memory bound is global
+        self.image_cache = ImageCache(
+            camera_options.get(
+                CONF_SNAPSHOT_CACHE_SIZE, CONF_SNAPSHOT_CACHE_SIZE_DEFAULT
+            )
+            * 1024
+        )
+        self.snapshot_prefetch: float = camera_options.get(
+            CONF_SNAPSHOT_PREFETCH, CONF_SNAPSHOT_PREFETCH_DEFAULT
+        )
+        self.image_store = ImageDiskStore(hass, hass.config.path(DOMAIN, "snapshots"))
+        self.stream_max_fps: float = camera_options.get(CONF_STREAM_MAX_FPS, 0)
+        self.state_write_delay: float = (
+            camera_options.get(CONF_STATE_WRITE_DELAY, 0) / 1000
+        )
+        self.image_transformer = ImageTransformer(
+            camera_options.get(CONF_SNAPSHOT_QUALITY, 0),
+            camera_options.get(CONF_SNAPSHOT_FORMAT, IMAGE_FORMAT_JPEG),
+        )
         MotionHttpClient.__init__(
             self,
             data[hac.CONF_HOST],
@@ -91,27 +160,16 @@ class MotionFrontendApi(MotionHttpClient):
         self, hass: "HomeAssistant", webhook_id: str, request: "aiohttp.web.Request"
     ):
         try:
-            async with asyncio.timeout(5):
-                data = dict(await request.post())
+            # our hooks send everything in the query string: no body to parse
+            data: dict[str, typing.Any] = dict(request.query)
+            if "event" not in data:
+                # hooks installed by older versions post a form
+                async with asyncio.timeout(5):
+                    data = dict(await request.post())
 
             LOGGER.debug("Received webhook - (%s)", data)
 
-            camera = typing.cast(
-                MotionFrontendCamera, self.getcamera(str(data["camera_id"]))
-            )
-            if self.media_dir_id:
-                try:  # fix the path as a media_source compatible url
-                    filename = data.get(EXTRA_ATTR_FILENAME)
-                    if filename:
-                        filename = Path(str(filename)).relative_to(
-                            str(self.config[cs.TARGET_DIR])
-                        )
-                        data[EXTRA_ATTR_FILENAME] = (
-                            f"{self.media_dir_id}/{str(filename)}"
-                        )
-                except:
-                    pass
-            camera.handle_event(data)
+            self.handle_event_data(data)
 
         except Exception as exception:
             LOGGER.error(
@@ -120,6 +178,68 @@ class MotionFrontendApi(MotionHttpClient):
                 str(exception),
             )
 
+    def handle_event_data(self, data: dict[str, typing.Any]):
+        """dispatch a motion event (from the webhook or the udp receiver)"""
+        camera = typing.cast(
+            MotionFrontendCamera, self.getcamera(str(data["camera_id"]))
+        )
+        if self.catalog and (data.get("event") in CATALOG_EVENTS):
+            # before filename gets rewritten for the media source
+            self.catalog.add_event(
+                str(data["event"]),
+                camera.id,
+                data.get(EXTRA_ATTR_EVENT_ID),  # type: ignore
+                data.get(EXTRA_ATTR_FILENAME),  # type: ignore
+                data.get("filetype"),  # type: ignore
+            )
+        if self.media_dir_id and (filename := data.get(EXTRA_ATTR_FILENAME)):
+            # fix the path as a media_source compatible url
+            target_dir_prefix = self.target_dir_prefix
+            if filename.startswith(target_dir_prefix):
+                data[EXTRA_ATTR_FILENAME] = (
+                    self.media_dir_prefix + filename[len(target_dir_prefix) :]
+                )
+        camera.handle_event(data)
+
+    def schedule_catalog_reconcile(self, *_) -> None:
+        if (self.catalog_reconcile is None) or self.catalog_reconcile.done():
+            self.catalog_reconcile = self.hass.async_create_background_task(
+                self._async_reconcile_catalog(), f"{DOMAIN} catalog reconcile"
+            )
+
+    async def _async_reconcile_catalog(self) -> None:
+        """catch up the catalog with the recordings we never got an event for"""
+        if not (catalog := self.catalog):
+            return
+        target_dir = self.target_dir_prefix.rstrip("/")
+        camera_dirs: dict[str, str | None] = {}
+        for camera in self.cameras.values():
+            camera_dir = str(camera.config.get(cs.TARGET_DIR) or target_dir)
+            # a directory shared by more cameras can't tell them apart
+            camera_dirs[camera_dir] = None if camera_dir in camera_dirs else camera.id
+        try:
+            scan_time = time()
+            files, unattributed = await self.hass.async_add_executor_job(
+                scan_recordings, target_dir, camera_dirs
+            )
+            added, removed = await catalog.async_reconcile(target_dir, files, scan_time)
+        except RuntimeError:
+            return  # catalog closed
+        except Exception as exception:
+            LOGGER.warning("Error (%s) scanning recordings", str(exception))
+            return
+        LOGGER.debug(
+            "Recordings catalog reconciled: %d added, %d removed", added, removed
+        )
+        if unattributed:
+            LOGGER.info(
+                "%d recordings in %s can't be attributed to a camera: they're not"
+                " accounted (nor subject to retention) unless notified by the hooks"
+                " (give every camera its own target_dir to have them)",
+                unattributed,
+                target_dir,
+            )
+
     @callback
     async def entry_update_listener(
         self, hass: "HomeAssistant", config_entry: "ConfigEntry"
@@ -142,9 +262,19 @@ def _entity_camera_factory(client: MotionFrontendApi, id: str):
 async def async_setup_entry(hass: "HomeAssistant", config_entry: "ConfigEntry"):
     hass.data.setdefault(DOMAIN, {})
 
+    if config_entry.data.get(CONF_EVENT_UDP_PORT) and not config_entry.data.get(
+        CONF_EVENT_UDP_SECRET
+    ):
+        # generated once and stored so that the installed hooks stay valid
+        hass.config_entries.async_update_entry(
+            config_entry,
+            data=config_entry.data | {CONF_EVENT_UDP_SECRET: udp_events.udp_secret()},
+        )
+
     data = config_entry.data
 
     api = MotionFrontendApi(hass, data)
+    time_start = monotonic()
     try:
         await api.update(updatecameras=True)
     except MotionHttpClientError as err:
@@ -153,6 +283,7 @@ async def async_setup_entry(hass: "HomeAssistant", config_entry: "ConfigEntry"):
 
     if not api.is_available:
         raise ConfigEntryNotReady
+    LOGGER.debug("Setup stage 'update' took %.3f s", monotonic() - time_start)
 
     api.unsub_entry_update_listener = config_entry.add_update_listener(
         api.entry_update_listener
@@ -160,97 +291,207 @@ async def async_setup_entry(hass: "HomeAssistant", config_entry: "ConfigEntry"):
 
     hass.data[DOMAIN][config_entry.entry_id] = api
 
+    # platforms (entities) don't need the hooks installed so these run together
+    # while the media source goes first since it decides if the recordings
+    # catalog (and its sensors) is available
+    await asyncio.gather(
+        _async_setup_stage("webhook", _async_setup_webhook(hass, api, config_entry)),
+        _async_setup_platforms(hass, api, config_entry),
+    )
+    LOGGER.debug("Setup took %.3f s", monotonic() - time_start)
+
+    return True
+
+
+async def _async_setup_stage(stage: str, coro: typing.Awaitable):
+    time_start = monotonic()
+    try:
+        return await coro
+    finally:
+        LOGGER.debug("Setup stage '%s' took %.3f s", stage, monotonic() - time_start)
+
+
+async def _async_setup_platforms(
+    hass: "HomeAssistant", api: MotionFrontendApi, config_entry: "ConfigEntry"
+):
+    await _async_setup_stage("media_source", _async_setup_media_source(hass, api))
+    await _async_setup_stage(
+        "platforms",
+        hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS),
+    )
+
+
+async def _async_setup_webhook(
+    hass: "HomeAssistant", api: MotionFrontendApi, config_entry: "ConfigEntry"
+):
+    data = config_entry.data
     webhook_mode = data.get(CONF_WEBHOOK_MODE)
-    if webhook_mode != CONF_OPTION_NONE:
-        # setup webhook to manage 'push' from motion server
-        try:
-            webhook_id = f"{DOMAIN}_{config_entry.entry_id}"
-            webhook.async_register(
-                hass, DOMAIN, DOMAIN, webhook_id, api.async_handle_webhook
+    if webhook_mode == CONF_OPTION_NONE:
+        return
+    # setup webhook to manage 'push' from motion server
+    try:
+        webhook_id = f"{DOMAIN}_{config_entry.entry_id}"
+        webhook.async_register(
+            hass, DOMAIN, DOMAIN, webhook_id, api.async_handle_webhook
+        )
+        api.webhook_id = webhook_id  # set here after succesfully calling async_register
+        webhook_address = data.get(CONF_WEBHOOK_ADDRESS, CONF_OPTION_DEFAULT)
+        if webhook_address == CONF_OPTION_INTERNAL:
+            api.webhook_url = get_url(
+                hass, allow_internal=True, allow_external=False, allow_cloud=False
             )
-            api.webhook_id = (
-                webhook_id  # set here after succesfully calling async_register
+        elif webhook_address == CONF_OPTION_EXTERNAL:
+            api.webhook_url = get_url(
+                hass,
+                allow_internal=False,
+                allow_external=True,
+                allow_cloud=True,
+                prefer_cloud=False,
             )
-            webhook_address = data.get(CONF_WEBHOOK_ADDRESS, CONF_OPTION_DEFAULT)
-            if webhook_address == CONF_OPTION_INTERNAL:
-                api.webhook_url = get_url(
-                    hass, allow_internal=True, allow_external=False, allow_cloud=False
+        elif webhook_address == CONF_OPTION_CLOUD:
+            api.webhook_url = get_url(
+                hass,
+                allow_internal=False,
+                allow_external=False,
+                allow_cloud=True,
+                prefer_cloud=True,
+            )
+        else:
+            api.webhook_url = get_url(hass)
+        webhook_path = webhook.async_generate_path(api.webhook_id)
+        api.webhook_url += webhook_path
+
+        force = webhook_mode == CONF_OPTION_FORCE
+
+        udp_port = data.get(CONF_EVENT_UDP_PORT)
+        udp_secret = data.get(CONF_EVENT_UDP_SECRET)
+        udp_host = None
+        if udp_port and udp_secret:
+            try:
+                api.udp_transport = await udp_events.async_start_receiver(
+                    api, udp_port, udp_secret
                 )
-            elif webhook_address == CONF_OPTION_EXTERNAL:
-                api.webhook_url = get_url(
-                    hass,
-                    allow_internal=False,
-                    allow_external=True,
-                    allow_cloud=True,
-                    prefer_cloud=False,
+                udp_host = URL(
+                    get_url(
+                        hass,
+                        allow_internal=True,
+                        allow_external=False,
+                        allow_cloud=False,
+                    )
+                ).host
+                LOGGER.info("Listening for motion events on udp port %d", udp_port)
+            except Exception as exception:
+                # fallback to the webhook
+                LOGGER.error(
+                    "exception (%s) setting up udp events receiver", str(exception)
                 )
-            elif webhook_address == CONF_OPTION_CLOUD:
-                api.webhook_url = get_url(
-                    hass,
-                    allow_internal=False,
-                    allow_external=False,
-                    allow_cloud=True,
-                    prefer_cloud=True,
+                if api.udp_transport:
+                    api.udp_transport.close()
+                    api.udp_transport = None
+
+        config = api.config
+        hookcommands = {}
+        for event in MANAGED_EVENTS:
+            if api.udp_transport:
+                hookcommand = udp_events.udp_hookcommand(
+                    event, udp_secret, udp_host, udp_port  # type: ignore
                 )
             else:
-                api.webhook_url = get_url(hass)
-            api.webhook_url += webhook.async_generate_path(api.webhook_id)
-
-            force = webhook_mode == CONF_OPTION_FORCE
-
-            config = api.config
-            for event in MANAGED_EVENTS:
+                # -G moves the (url encoded) data into the query string
                 hookcommand = (
-                    f"curl%20-d%20'event={event}'%20"
-                    "-d%20'camera_id=%t'%20"
-                    "-d%20'event_id=%v'%20"
-                    "-d%20'filename=%f'%20"
-                    "-d%20'filetype=%n'%20"
+                    "curl%20-s%20-G%20-X%20POST%20"
+                    f"--data-urlencode%20'event={event}'%20"
+                    "--data-urlencode%20'camera_id=%t'%20"
+                    "--data-urlencode%20'event_id=%v'%20"
+                    "--data-urlencode%20'filename=%f'%20"
+                    "--data-urlencode%20'filetype=%n'%20"
                     f"{api.webhook_url}"
                 )
 
-                command = config.get(event)
-                if (command != hookcommand) and (force or (command is None)):
-                    await api.async_config_set(event, hookcommand)
+            command = config.get(event)
+            if command in (hookcommand, unquote(hookcommand)):
+                continue
+            if (
+                force
+                or (command is None)
+                # our own hooks (webhook or udp) are updated when switching
+                # between them or when the udp port/address changes
+                or (webhook_path in command)
+                or (udp_secret and (udp_secret in command))
+            ):
+                hookcommands[event] = hookcommand
+
+        await api.async_config_set_many(hookcommands)
+
+        LOGGER.info("Registered webhook for motion events")
+    except Exception as exception:
+        LOGGER.exception("exception (%s) setting up webhook", str(exception))
+        if api.webhook_id:
+            webhook.async_unregister(hass, api.webhook_id)  # this is actually 'safe'
+            api.webhook_id = None
+            api.webhook_url = None
 
-            LOGGER.info("Registered webhook for motion events")
-        except Exception as exception:
-            LOGGER.exception("exception (%s) setting up webhook", str(exception))
-            if api.webhook_id:
-                webhook.async_unregister(
-                    hass, api.webhook_id
-                )  # this is actually 'safe'
-                api.webhook_id = None
-                api.webhook_url = None
 
+def _check_target_dir(target_dir: str) -> bool:
+    """validate target_dir (runs in the executor since it hits the disk)"""
+    raise_if_invalid_path(target_dir)
+    return os.access(target_dir, os.R_OK)
+
+
+async def _async_setup_media_source(hass: "HomeAssistant", api: MotionFrontendApi):
     # setup media_source entry to access server recordings if they're local
-    if data.get(CONF_MEDIASOURCE):
-        try:
-            media_dir_id = f"{DOMAIN}_{api.unique_id}"
-            if media_dir_id not in hass.config.media_dirs:
-                target_dir: str | None = api.config.get(cs.TARGET_DIR)  # type: ignore
-                if target_dir:
-                    raise_if_invalid_path(target_dir)
-                    if os.access(target_dir, os.R_OK):
-                        hass.config.media_dirs[media_dir_id] = target_dir
-                        LOGGER.info(
-                            "Registered media_dirs[%s] for motion server target_dir",
-                            media_dir_id,
-                        )
-                        api.media_dir_id = media_dir_id
-                    else:
-                        LOGGER.error(
-                            "Missing read access for target recordings directory"
-                        )
-
-        except Exception as err:
-            LOGGER.exception(
-                "exception (%s) setting up media_source directory", str(err)
+    data = api.config_data
+    if not data.get(CONF_MEDIASOURCE):
+        return
+    try:
+        media_dir_id = f"{DOMAIN}_{api.unique_id}"
+        if media_dir_id in hass.config.media_dirs:
+            return
+        target_dir: str | None = api.config.get(cs.TARGET_DIR)  # type: ignore
+        if not target_dir:
+            return
+        if not await hass.async_add_executor_job(_check_target_dir, target_dir):
+            LOGGER.error("Missing read access for target recordings directory")
+            return
+        hass.config.media_dirs[media_dir_id] = target_dir
+        LOGGER.info(
+            "Registered media_dirs[%s] for motion server target_dir",
+            media_dir_id,
+        )
+        api.media_dir_id = media_dir_id
+        api.target_dir_prefix = target_dir.rstrip("/") + "/"
+        api.media_dir_prefix = media_dir_id + "/"
+        api.catalog = RecordingCatalog(
+            hass.config.path(DOMAIN, re.sub(r"[^\w.-]", "_", api.unique_id) + ".db")
+        )
+        api.catalog.start()
+        # recordings made while we weren't listening (HA down, no hooks..)
+        api.schedule_catalog_reconcile()
+        if data.get(CONF_WEBHOOK_MODE) == CONF_OPTION_NONE:
+            # no events at all: the scan is the only source
+            api.unsub_catalog_reconcile = async_track_time_interval(
+                hass, api.schedule_catalog_reconcile, RECONCILE_INTERVAL
             )
+        # only needed (and loaded) when the media source is enabled
+        media_index = await async_import_module(hass, f"{__name__}.media_index")
+        api.media_index = media_index.MediaIndex(hass, target_dir)
+        api.media_index.start()
+        retention_options = data.get(CONF_OPTION_RETENTION, {})
+        max_age = retention_options.get(CONF_RETENTION_MAX_AGE, 0)
+        max_size = retention_options.get(CONF_RETENTION_MAX_SIZE, 0)
+        if max_age or max_size:
+            api.retention = RetentionManager(
+                hass,
+                api.catalog,
+                target_dir,
+                max_age * 86400,
+                max_size * 1048576,
+                retention_options.get(CONF_RETENTION_CAMERAS),
+            )
+            api.retention.start()
 
-    await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
-
-    return True
+    except Exception as err:
+        LOGGER.exception("exception (%s) setting up media_source directory", str(err))
 
 
 async def async_unload_entry(hass: "HomeAssistant", config_entry: "ConfigEntry"):
@@ -259,9 +500,28 @@ async def async_unload_entry(hass: "HomeAssistant", config_entry: "ConfigEntry")
         hassdata: dict = hass.data[DOMAIN]
         api: MotionFrontendApi = hassdata[config_entry.entry_id]
         await api.close()
+        await api.image_store.async_flush()
+        if api.retention:
+            api.retention.close()
+            api.retention = None
+        if api.unsub_catalog_reconcile:
+            api.unsub_catalog_reconcile()
+            api.unsub_catalog_reconcile = None
+        if api.catalog_reconcile:
+            api.catalog_reconcile.cancel()
+            api.catalog_reconcile = None
+        if api.catalog:
+            await api.catalog.async_close()
+            api.catalog = None
         if api.webhook_id:
             webhook.async_unregister(hass, api.webhook_id)
             api.webhook_id = None
+        if api.udp_transport:
+            api.udp_transport.close()
+            api.udp_transport = None
+        if api.media_index:
+            api.media_index.close()
+            api.media_index = None
         if api.media_dir_id:
             try:  # better be safe...
                 hass.config.media_dirs.pop(api.media_dir_id, None)
@@ -271,6 +531,8 @@ async def async_unload_entry(hass: "HomeAssistant", config_entry: "ConfigEntry")
             api.unsub_entry_update_listener()
             api.unsub_entry_update_listener = None
         hassdata.pop(config_entry.entry_id)
+        if not hassdata:
+            shutdown_executor()  # image transform workers
         return True
 
     return False
@@ -100,6 +100,10 @@ class MotionFrontendAlarmControlPanel(
         "_pause_disarmed",
         "_disarm_sets",
         "_current_disarm_set",
+        "_triggered",
+        "_disconnected",
+        "_armed_triggered",
+        "_armed_disconnected",
     )
 
     def __init__(self, api: "MotionFrontendApi"):
@@ -122,6 +126,15 @@ class MotionFrontendAlarmControlPanel(
             if self._pin
             else None
         )
+        # live aggregates so that state evaluation doesn't need to scan cameras
+        self._triggered: set[str] = {
+            camera.id for camera in api.cameras.values() if camera.is_triggered
+        }
+        self._disconnected: set[str] = {
+            camera.id for camera in api.cameras.values() if not camera.connected
+        }
+        self._armed_triggered = 0  # triggered cameras not in the disarm set
+        self._armed_disconnected = 0
         self.device_info = self._api.device_info
         self.extra_state_attributes = {}
         self.name = f"{api.name} Alarm Panel"
@@ -144,6 +157,7 @@ class MotionFrontendAlarmControlPanel(
                     self._current_disarm_set = _disarm_set
                     self.state = self._armmode = _state
                     break
+        self._recount()
 
 
 
@@ -176,6 +190,7 @@ class MotionFrontendAlarmControlPanel(
     async def async_alarm_disarm(self, code=None):
         if code == self._pin:
             self._current_disarm_set = frozenset()
+            self._recount()
             if self._pause_disarmed:
                 for camera in self._api.cameras.values():
                     camera.paused = True
@@ -201,16 +216,36 @@ class MotionFrontendAlarmControlPanel(
 
     async def _async_alarm_arm_state(self, state: AlarmControlPanelState):
         self._current_disarm_set = self._disarm_sets[state]
+        self._recount()
         if self._pause_disarmed:
             for camera in self._api.cameras.values():
                 camera.paused = camera.id in self._current_disarm_set
         self._set_armmode(state)
 
     def notify_state_changed(self, camera: "MotionFrontendCamera"):
+        _id = camera.id
+        armed = _id not in self._current_disarm_set
+        triggered = camera.is_triggered
+        if triggered != (_id in self._triggered):
+            if triggered:
+                self._triggered.add(_id)
+            else:
+                self._triggered.discard(_id)
+            if armed:
+                self._armed_triggered += 1 if triggered else -1
+        disconnected = not camera.connected
+        if disconnected != (_id in self._disconnected):
+            if disconnected:
+                self._disconnected.add(_id)
+            else:
+                self._disconnected.discard(_id)
+            if armed:
+                self._armed_disconnected += 1 if disconnected else -1
+
         if self._armmode is AlarmControlPanelState.DISARMED:
             return
 
-        if camera.id in self._current_disarm_set:
+        if not armed:
             return
 
         if camera.is_triggered:
@@ -226,20 +261,22 @@ class MotionFrontendAlarmControlPanel(
                 return
 
         # if not any 'rising' event then check the state of all the other
-        problem = False
-        for _id, _camera in self._api.cameras.items():
-            if _id in self._current_disarm_set:
-                continue
-            if _camera.is_triggered:
-                self._set_state(AlarmControlPanelState.TRIGGERED)
-                break
-            problem |= not _camera.connected
+        if self._armed_triggered:
+            self._set_state(AlarmControlPanelState.TRIGGERED)
         else:
             # We'll use PENDING to indicate a camera connection problem
             self._set_state(
-                AlarmControlPanelState.PENDING if problem else self._armmode
+                AlarmControlPanelState.PENDING
+                if self._armed_disconnected
+                else self._armmode
             )
 
+    def _recount(self) -> None:
+        """refresh the armed aggregates when the disarm set changes"""
+        disarm_set = self._current_disarm_set
+        self._armed_triggered = len(self._triggered - disarm_set)
+        self._armed_disconnected = len(self._disconnected - disarm_set)
+
     def _set_armmode(self, state: AlarmControlPanelState) -> None:
         if self._armmode != state:
             self._armmode = state
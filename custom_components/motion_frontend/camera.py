@@ -1,19 +1,13 @@
 import asyncio
 from contextlib import closing
-from functools import partial
+from time import monotonic
 import typing
 
-import aiohttp
 from homeassistant.components import camera
 from homeassistant.helpers import entity_platform
 
 # from homeassistant.helpers import config_validation as cv
-from homeassistant.helpers.aiohttp_client import (
-    async_aiohttp_proxy_web,
-    async_get_clientsession,
-)
-import requests
-from requests.auth import HTTPBasicAuth, HTTPDigestAuth
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 import voluptuous as vol
 
 from .const import (
@@ -31,9 +25,12 @@ from .const import (
     ON_MOTION_DETECTED,
     ON_MOVIE_END,
     ON_MOVIE_START,
+    ON_PICTURE_SAVE,
 )
 from .helpers import LOGGER
+from .mjpeg_hub import MjpegHub
 from .motionclient import MotionCamera, TlsMode, config_schema as cs
+from .motionclient.mjpeg import JpegScanner, async_read_frame
 
 if typing.TYPE_CHECKING:
     from homeassistant.config_entries import ConfigEntry
@@ -41,6 +38,7 @@ if typing.TYPE_CHECKING:
     from homeassistant.helpers.device_registry import DeviceInfo
 
     from . import MotionFrontendApi
+    from .image_cache import CachedImage
 
 
 SERVICE_KEY_PARAM = "param"
@@ -77,16 +75,38 @@ async def async_unload_entry(hass: "HomeAssistant", config_entry: "ConfigEntry")
             hass.services.async_remove(DOMAIN, service_entry[0])
 
 
+EVENT_DEDUP_WINDOW = 2.0  # seconds
+EVENT_DEDUP_SIZE = 64  # prune the seen events when growing past this
+# only motion/recording events get repeated: connection events are always processed
+EVENT_DEDUP_SET = {
+    ON_EVENT_START,
+    ON_EVENT_END,
+    ON_MOTION_DETECTED,
+    ON_AREA_DETECTED,
+    ON_MOVIE_START,
+    ON_MOVIE_END,
+    ON_PICTURE_SAVE,
+}
+# event -> (state setter, value)
+EVENT_TRANSITIONS = {
+    ON_MOVIE_START: ("_setrecording", True),
+    ON_MOVIE_END: ("_setrecording", False),
+    ON_EVENT_END: ("_settriggered", False),
+    ON_MOTION_DETECTED: ("_settriggered", True),
+    ON_EVENT_START: ("_settriggered", True),
+    ON_AREA_DETECTED: ("_settriggered", True),
+    ON_CAMERA_FOUND: ("_setconnected", True),
+    ON_CAMERA_LOST: ("_setconnected", False),
+}
+
+
 def _extract_image_from_mjpeg(stream):
     """Take in a MJPEG stream object, return the jpg from it."""
-    data = b""
+    scanner = JpegScanner()
     for chunk in stream:
-        data += chunk
-        jpg_end = data.find(b"\xff\xd9")
-        if jpg_end != -1:
-            jpg_start = data.find(b"\xff\xd8")
-            if jpg_start != -1:
-                return data[jpg_start : jpg_end + 2]
+        scanner.feed(chunk)
+        if (frame := scanner.next_frame()) is not None:
+            return frame
 
 
 class MotionFrontendCamera(camera.Camera, MotionCamera):
@@ -114,12 +134,28 @@ class MotionFrontendCamera(camera.Camera, MotionCamera):
         "is_triggered",
         "motion_detection_enabled",
         "unique_id",
-        "_camera_image",
+        "_image_fetch",
+        "_mjpeg_hub",
+        "_prefetch_time",
+        "events_received",
+        "events_merged",
+        "events_dropped",
+        "_events_seen",
+        "_pending_events",
+        "_state_write",
     )
 
     def __init__(self, client: "MotionFrontendApi", id: str):
         MotionCamera.__init__(self, client, id)
-        self._camera_image = None
+        self._image_fetch: asyncio.Task | None = None
+        self._mjpeg_hub: MjpegHub | None = None
+        self._prefetch_time = 0.0
+        self.events_received = 0
+        self.events_merged = 0  # superseded by a later event in the same burst
+        self.events_dropped = 0  # duplicates
+        self._events_seen: dict[tuple, float] = {}
+        self._pending_events: dict[str, bool] = {}
+        self._state_write: asyncio.Handle | None = None
         self.available = self.connected
         self.device_info = self.client.device_info
         self.extra_state_attributes = {}
@@ -128,6 +164,7 @@ class MotionFrontendCamera(camera.Camera, MotionCamera):
         self.motion_detection_enabled = not self.paused
         self.unique_id = f"{client.unique_id}_{self.camera_id}"
         camera.Camera.__init__(self)
+        self.content_type = client.image_transformer.content_type
 
     @property
     def name(self):
@@ -138,42 +175,106 @@ class MotionFrontendCamera(camera.Camera, MotionCamera):
         self, width: int | None = None, height: int | None = None
     ) -> bytes | None:
         """Return a still image response from the camera."""
-        if self.connected:
+        cached = await self._async_get_image()
+        if cached is None:
+            return None
+        transformer = self.client.image_transformer
+        if width or height or transformer.transcode:
+            return await transformer.async_transform(
+                self.unique_id, cached, width, height
+            )
+        return cached.image
+
+    async def _async_get_image(self) -> "CachedImage | None":
+        cached = self.client.image_cache.get(self.unique_id)
+        if cached is None:
+            # evicted (or not fetched yet since restarting)
+            cached = await self._async_load_image()
+        if cached and (cached.age < self.client.snapshot_ttl):
+            return cached
+
+        if not self.connected:
             # only pull the stream/image when the remote is connected
             # so we both save bandwith and we're able to deliver an
             # old snapshot when camera get out of reach
-            try:
-                # DigestAuth is not supported by aiohttp
-                image_url = self.image_url
-                stream_auth_method = self.config.get(cs.STREAM_AUTH_METHOD)
-                if (image_url is None) or (stream_auth_method == cs.AUTH_MODE_DIGEST):
-                    self._camera_image = await self.hass.async_add_executor_job(
-                        partial(self.camera_image, width=width, height=height)
-                    )
-                    return self._camera_image
+            return cached
+
+        # shield so that a caller going away doesn't cancel the others
+        return await asyncio.shield(self._get_image_fetch())
+
+    async def _async_load_image(self) -> "CachedImage | None":
+        """fallback to the last image persisted on disk (never fresh)"""
+        if image := await self.client.image_store.async_load(self.unique_id):
+            if (cached := self.client.image_cache.get(self.unique_id)) is None:
+                cached = self.client.image_cache.put(self.unique_id, image, stale=True)
+            return cached
+        return self.client.image_cache.get(self.unique_id)
+
+    def _get_image_fetch(self) -> asyncio.Task:
+        """single-flight: concurrent requests all wait on the same fetch"""
+        image_fetch = self._image_fetch
+        if (image_fetch is None) or image_fetch.done():
+            self._image_fetch = image_fetch = self.hass.async_create_task(
+                self._async_fetch_image()
+            )
+        return image_fetch
 
-                websession = async_get_clientsession(
-                    self.hass, verify_ssl=(self.client.tlsmode == TlsMode.STRICT)
-                )
-                if stream_auth_method == cs.AUTH_MODE_BASIC:
-                    stream_authentication = self.stream_authentication
-                    auth = aiohttp.BasicAuth(
-                        stream_authentication[0], stream_authentication[-1]
+    def _prefetch_image(self) -> None:
+        """
+        refresh the cached snapshot when motion triggers so that the
+        notifications/dashboards requests coming right after are served
+        from memory
+        """
+        interval = self.client.snapshot_prefetch
+        if (not interval) or (not self.connected) or (self.hass is None):
+            return
+        now = monotonic()
+        if (now - self._prefetch_time) < interval:
+            return
+        self._prefetch_time = now
+        self._get_image_fetch()
+
+    async def _async_fetch_image(self) -> "CachedImage | None":
+        try:
+            image_url = self.image_url
+            websession = async_get_clientsession(
+                self.hass, verify_ssl=(self.client.tlsmode == TlsMode.STRICT)
+            )
+            async with asyncio.timeout(10):
+                if image_url is None:
+                    # legacy motion (no /current endpoint): parse the MJPEG stream
+                    response = await self.async_stream_request(
+                        self.stream_url, session=websession
                     )
+                    try:
+                        response.raise_for_status()
+                        image = await async_read_frame(response)
+                    finally:
+                        response.close()  # never ending stream: drop the connection
                 else:
-                    auth = None
-
-                async with asyncio.timeout(10):
-                    response = await websession.get(image_url, auth=auth)
-                    self._camera_image = await response.read()
-                    return self._camera_image
-
-            except Exception as exception:
-                LOGGER.warning(
-                    "Error (%s) fetching image from %s", str(exception), self.name
-                )
+                    response = await self.async_stream_request(
+                        image_url, session=websession
+                    )
+                    try:
+                        response.raise_for_status()
+                        image = await response.read()
+                    finally:
+                        response.release()  # back to the pool (even on errors)
+
+            if image:
+                self.client.image_store.save(self.unique_id, image)
+                return self.client.image_cache.put(self.unique_id, image)
+
+        except Exception as exception:
+            LOGGER.warning(
+                "Error (%s) fetching image from %s", str(exception), self.name
+            )
+        finally:
+            self._image_fetch = None
 
-        return self._camera_image
+        if cached := self.client.image_cache.get(self.unique_id):
+            return cached
+        return await self._async_load_image()
 
     def camera_image(
         self, width: int | None = None, height: int | None = None
@@ -184,6 +285,10 @@ class MotionFrontendCamera(camera.Camera, MotionCamera):
         we don't have a real jpeg endpoint and we need
         to parse the MJPEG stream
         """
+        # sync fallback (executor) only: don't pay requests import otherwise
+        import requests
+        from requests.auth import HTTPBasicAuth, HTTPDigestAuth
+
         stream_auth_method = self.config.get(cs.STREAM_AUTH_METHOD)
         auth = None
         if stream_auth_method:
@@ -210,23 +315,23 @@ class MotionFrontendCamera(camera.Camera, MotionCamera):
 
     async def handle_async_mjpeg_stream(self, request):
         """Generate an HTTP MJPEG stream from the camera."""
-        # aiohttp don't support DigestAuth -> Fallback
-        stream_auth_method = self.config.get(cs.STREAM_AUTH_METHOD)
-        auth = None
-        if stream_auth_method == cs.AUTH_MODE_DIGEST:
-            return await super().handle_async_mjpeg_stream(request)
-        elif stream_auth_method == cs.AUTH_MODE_BASIC:
-            stream_authentication = self.stream_authentication
-            auth = aiohttp.BasicAuth(
-                stream_authentication[0], stream_authentication[-1]
-            )
-
-        # connect to stream
-        websession = async_get_clientsession(
-            self.hass, verify_ssl=(self.client.tlsmode == TlsMode.STRICT)
-        )
-        stream_coro = websession.get(self.stream_url, auth=auth)
-        return await async_aiohttp_proxy_web(self.hass, request, stream_coro)
+        # all the viewers share a single upstream connection
+        if self._mjpeg_hub is None:
+            self._mjpeg_hub = MjpegHub(self)
+        try:  # viewers can ask for a lower rate (i.e. '?fps=2')
+            max_fps = float(request.query["fps"])
+        except (KeyError, ValueError):
+            max_fps = self.client.stream_max_fps
+        return await self._mjpeg_hub.async_handle_request(request, max_fps)
+
+    async def async_will_remove_from_hass(self) -> None:
+        if self._state_write:
+            self._state_write.cancel()
+            self._state_write = None
+        if self._mjpeg_hub:
+            await self._mjpeg_hub.async_close()
+            self._mjpeg_hub = None
+        await super().async_will_remove_from_hass()
 
     """
     services
@@ -245,27 +350,56 @@ class MotionFrontendCamera(camera.Camera, MotionCamera):
         await self.client.async_detection_pause(self._id)
 
     def handle_event(self, data: dict) -> None:
+        self.events_received += 1
+        event = data.get("event")
         event_id = data.get(EXTRA_ATTR_EVENT_ID)
+        filename = data.get(EXTRA_ATTR_FILENAME)
+
+        if event in EVENT_DEDUP_SET:
+            # drop repeated posts (curl retries, motion_detected on every frame..)
+            now = monotonic()
+            events_seen = self._events_seen
+            key = (event, event_id, filename)
+            if now - events_seen.get(key, -EVENT_DEDUP_WINDOW) < EVENT_DEDUP_WINDOW:
+                self.events_dropped += 1
+                return
+            events_seen[key] = now
+            if len(events_seen) > EVENT_DEDUP_SIZE:
+                self._events_seen = {
+                    _key: _time
+                    for _key, _time in events_seen.items()
+                    if now - _time < EVENT_DEDUP_WINDOW
+                }
+
         if event_id:
             self.extra_state_attributes[EXTRA_ATTR_EVENT_ID] = event_id
-        filename = data.get(EXTRA_ATTR_FILENAME)
         if filename:
             self.extra_state_attributes[EXTRA_ATTR_FILENAME] = filename
 
-        event = data.get("event")
-        if event == ON_MOVIE_START:
-            self._setrecording(True)
-        elif event == ON_MOVIE_END:
-            self._setrecording(False)
-        elif event == ON_EVENT_END:
-            self._settriggered(False)
-        elif event in (ON_MOTION_DETECTED, ON_EVENT_START, ON_AREA_DETECTED):
-            self._settriggered(True)
-        elif event == ON_CAMERA_FOUND:
-            self._setconnected(True)
-        elif event == ON_CAMERA_LOST:
-            self._setconnected(False)
-        return
+        if event in (ON_EVENT_START, ON_MOTION_DETECTED):
+            self._prefetch_image()
+
+        if (transition := EVENT_TRANSITIONS.get(event)) is None:  # type: ignore
+            return
+        setter, value = transition
+        pending = self._pending_events
+        if (setter == "_settriggered") and value and not self.is_triggered:
+            if setter not in pending:
+                # rising edge: the alarm panel must know now
+                self._settriggered(True)
+                return
+        if not pending:
+            # fold the burst into its final state at the next loop iteration
+            asyncio.get_running_loop().call_soon(self._apply_events)
+        elif setter in pending:
+            self.events_merged += 1
+        pending[setter] = value
+
+    def _apply_events(self) -> None:
+        pending = self._pending_events
+        self._pending_events = {}
+        for setter, value in pending.items():
+            getattr(self, setter)(value)
 
     def _setrecording(self, recording: bool):
         if self.is_recording != recording:
@@ -306,6 +440,17 @@ class MotionFrontendCamera(camera.Camera, MotionCamera):
     """
 
     def _flush_state(self) -> None:
+        # the alarm panel is notified synchronously (triggering can't wait)
+        self.client.notify_state_changed(self)
+        # while the HA state write is shared among all the changes
+        # happening in the same loop iteration (or in state_write_delay)
+        if (self._state_write is None) and self.hass and self.enabled:
+            if delay := self.client.state_write_delay:
+                self._state_write = self.hass.loop.call_later(delay, self._write_state)
+            else:
+                self._state_write = self.hass.loop.call_soon(self._write_state)
+
+    def _write_state(self) -> None:
+        self._state_write = None
         if self.hass and self.enabled:
             self.async_write_ha_state()
-        self.client.notify_state_changed(self)
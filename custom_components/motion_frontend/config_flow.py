@@ -12,12 +12,28 @@ from .const import (
     CONF_ALARM_DISARMHOME_CAMERAS,
     CONF_ALARM_DISARMNIGHT_CAMERAS,
     CONF_ALARM_PAUSE_DISARMED,
+    CONF_EVENT_UDP_PORT,
     CONF_MEDIASOURCE,
     CONF_OPTION_ALARM,
+    CONF_OPTION_CAMERA,
     CONF_OPTION_CONNECTION,
     CONF_OPTION_NONE,
+    CONF_OPTION_RETENTION,
     CONF_OPTION_UNKNOWN,
     CONF_PORT_DEFAULT,
+    CONF_RETENTION_CAMERAS,
+    CONF_RETENTION_MAX_AGE,
+    CONF_RETENTION_MAX_SIZE,
+    CONF_SNAPSHOT_CACHE_SIZE,
+    CONF_SNAPSHOT_CACHE_SIZE_DEFAULT,
+    CONF_SNAPSHOT_FORMAT,
+    CONF_SNAPSHOT_PREFETCH,
+    CONF_SNAPSHOT_PREFETCH_DEFAULT,
+    CONF_SNAPSHOT_QUALITY,
+    CONF_SNAPSHOT_TTL,
+    CONF_SNAPSHOT_TTL_DEFAULT,
+    CONF_STATE_WRITE_DELAY,
+    CONF_STREAM_MAX_FPS,
     CONF_TLS_MODE,
     CONF_TLS_MODE_OPTIONS,
     CONF_WEBHOOK_ADDRESS,
@@ -28,12 +44,14 @@ from .const import (
     MAP_TLS_MODE,
 )
 from .helpers import LOGGER
+from .image_transform import IMAGE_FORMAT_OPTIONS
 from .motionclient import (
     MotionHttpClient,
     MotionHttpClientConnectionError,
     MotionHttpClientError,
     config_schema as cs,
 )
+from .motionclient.config_store import ConfigStore
 
 # OptionsFlow: async_step_init
 CONF_SELECT_FLOW = "select_flow"
@@ -41,6 +59,8 @@ CONF_SELECT_FLOW_OPTIONS = {
     CONF_OPTION_NONE: CONF_OPTION_NONE,
     CONF_OPTION_CONNECTION: "Connection",
     CONF_OPTION_ALARM: "Alarm Panel",
+    CONF_OPTION_CAMERA: "Cameras",
+    CONF_OPTION_RETENTION: "Recordings",
     ### we'll add the keys (one each) at runtime for the camera config(s)
     ### so to be able to access any camera (or global) configuration
 }
@@ -236,6 +256,10 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 return await self.async_step_connection()
             elif selected == CONF_OPTION_ALARM:
                 return await self.async_step_alarm()
+            elif selected == CONF_OPTION_CAMERA:
+                return await self.async_step_camera()
+            elif selected == CONF_OPTION_RETENTION:
+                return await self.async_step_retention()
             elif selected in self._config_set.keys():
                 # getting here means self._api was retrieved so we can interact with it
                 self._config_id = selected
@@ -310,6 +334,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             data[CONF_TLS_MODE] = user_input.get(CONF_TLS_MODE)
             data[CONF_WEBHOOK_MODE] = user_input.get(CONF_WEBHOOK_MODE)
             data[CONF_WEBHOOK_ADDRESS] = user_input.get(CONF_WEBHOOK_ADDRESS)
+            data[CONF_EVENT_UDP_PORT] = user_input.get(CONF_EVENT_UDP_PORT)
             data[CONF_MEDIASOURCE] = user_input.get(CONF_MEDIASOURCE)
             if client.is_available:
                 return await self.async_step_init()
@@ -341,6 +366,10 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                         default=CONF_WEBHOOK_ADDRESS_OPTIONS[0],  # type: ignore
                         description={"suggested_value": data.get(CONF_WEBHOOK_ADDRESS)},
                     ): vol.In(CONF_WEBHOOK_ADDRESS_OPTIONS),
+                    vol.Optional(
+                        CONF_EVENT_UDP_PORT,
+                        description={"suggested_value": data.get(CONF_EVENT_UDP_PORT)},
+                    ): vol.All(int, vol.Range(min=0, max=65535)),
                     vol.Optional(
                         CONF_MEDIASOURCE,
                         description={"suggested_value": data.get(CONF_MEDIASOURCE)},
@@ -421,6 +450,105 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             errors=errors,
         )
 
+    async def async_step_camera(self, user_input=None):
+        data = self._data.get(CONF_OPTION_CAMERA, {})
+
+        if user_input is not None:
+            self._data[CONF_OPTION_CAMERA] = user_input
+            return await self.async_step_init()
+
+        return self.async_show_form(
+            step_id="camera",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_SNAPSHOT_TTL,
+                        default=CONF_SNAPSHOT_TTL_DEFAULT,  # type: ignore
+                        description={"suggested_value": data.get(CONF_SNAPSHOT_TTL)},
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_SNAPSHOT_CACHE_SIZE,
+                        default=CONF_SNAPSHOT_CACHE_SIZE_DEFAULT,  # type: ignore
+                        description={
+                            "suggested_value": data.get(CONF_SNAPSHOT_CACHE_SIZE)
+                        },
+                    ): int,
+                    vol.Optional(
+                        CONF_SNAPSHOT_QUALITY,
+                        default=0,  # type: ignore
+                        description={
+                            "suggested_value": data.get(CONF_SNAPSHOT_QUALITY)
+                        },
+                    ): vol.All(int, vol.Range(min=0, max=100)),
+                    vol.Optional(
+                        CONF_SNAPSHOT_FORMAT,
+                        default=IMAGE_FORMAT_OPTIONS[0],  # type: ignore
+                        description={"suggested_value": data.get(CONF_SNAPSHOT_FORMAT)},
+                    ): vol.In(IMAGE_FORMAT_OPTIONS),
+                    vol.Optional(
+                        CONF_SNAPSHOT_PREFETCH,
+                        default=CONF_SNAPSHOT_PREFETCH_DEFAULT,  # type: ignore
+                        description={
+                            "suggested_value": data.get(CONF_SNAPSHOT_PREFETCH)
+                        },
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_STREAM_MAX_FPS,
+                        default=0,  # type: ignore
+                        description={"suggested_value": data.get(CONF_STREAM_MAX_FPS)},
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_STATE_WRITE_DELAY,
+                        default=0,  # type: ignore
+                        description={
+                            "suggested_value": data.get(CONF_STATE_WRITE_DELAY)
+                        },
+                    ): vol.All(int, vol.Range(min=0, max=1000)),
+                }
+            ),
+        )
+
+    async def async_step_retention(self, user_input=None):
+        data = self._data.get(CONF_OPTION_RETENTION, {})
+
+        if user_input is not None:
+            self._data[CONF_OPTION_RETENTION] = user_input
+            return await self.async_step_init()
+
+        cameras = dict(self._config_set)
+        if len(cameras):
+            cameras.pop(cs.GLOBAL_ID, None)
+        else:  # add what we know so far in case the api is unavailable
+            cameras.update({_id: _id for _id in data.get(CONF_RETENTION_CAMERAS, [])})
+
+        return self.async_show_form(
+            step_id="retention",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_RETENTION_MAX_AGE,
+                        default=0,  # type: ignore
+                        description={
+                            "suggested_value": data.get(CONF_RETENTION_MAX_AGE)
+                        },
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_RETENTION_MAX_SIZE,
+                        default=0,  # type: ignore
+                        description={
+                            "suggested_value": data.get(CONF_RETENTION_MAX_SIZE)
+                        },
+                    ): vol.All(int, vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_RETENTION_CAMERAS,
+                        description={
+                            "suggested_value": data.get(CONF_RETENTION_CAMERAS)
+                        },
+                    ): cv.multi_select(cameras),
+                }
+            ),
+        )
+
     async def async_step_config(self, user_input=None):
         errors = {}
 
@@ -449,7 +577,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 return await self.async_step_init()
             # else load another schema/options to edit
 
-        config = self._api.configs.get(self._config_id, {})
+        config = self._api.configs.get(self._config_id) or ConfigStore()
         config_section_map = cs.SECTION_SET_MAP.get(self._config_section)
         schema = {}
         if config_section_map:
@@ -459,14 +587,13 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 if self._config_id == cs.GLOBAL_ID
                 else cs.GLOBALCONFIG_SET
             )
-            for key, descriptor in config_section_map.items():
+            for key in config_section_map:
                 if (key in config) and (key not in config_exclusion_set):
-                    param = config.get(key)
                     schema[
-                        vol.Optional(key, description={"suggested_value": param})
-                    ] = _map_motion_cs_validator(
-                        descriptor if param is None else param.descriptor
-                    )
+                        vol.Optional(
+                            key, description={"suggested_value": config.get(key)}
+                        )
+                    ] = _map_motion_cs_validator(config.descriptor(key))
             """
             schema = {
                 vol.Optional(key, description={'suggested_value': config.get(key)})
@@ -478,15 +605,12 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             # expose any param we didn't normalize
             # This isnt working fine since the frontend is not able to render an unknown description
             for key in config.keys():
-                if key not in cs.SCHEMA.keys():
-                    param = config.get(key)
+                if key not in cs.SCHEMA:
                     schema[
-                        vol.Optional(key, description={"suggested_value": param})
-                    ] = (
-                        str
-                        if param is None
-                        else _map_motion_cs_validator(param.descriptor)
-                    )
+                        vol.Optional(
+                            key, description={"suggested_value": config.get(key)}
+                        )
+                    ] = _map_motion_cs_validator(config.descriptor(key))
             """
             schema = {
                 vol.Optional(key, description={'suggested_value': config.get(key)})
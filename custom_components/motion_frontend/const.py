@@ -2,7 +2,7 @@
 from .motionclient import TlsMode
 
 DOMAIN = "motion_frontend"
-PLATFORMS = ["camera", "alarm_control_panel"]
+PLATFORMS = ["camera", "alarm_control_panel", "sensor"]
 
 
 CONF_PORT_DEFAULT = 8080
@@ -17,6 +17,8 @@ CONF_OPTION_EXTERNAL = 'external'
 CONF_OPTION_CLOUD = 'cloud'
 CONF_OPTION_CONNECTION = 'connection'
 CONF_OPTION_ALARM = 'alarm'
+CONF_OPTION_CAMERA = 'camera'
+CONF_OPTION_RETENTION = 'retention'
 CONF_OPTION_UNKNOWN = 'unknown'
 
 CONF_TLS_MODE = "tls_mode"
@@ -50,6 +52,12 @@ CONF_WEBHOOK_ADDRESS_OPTIONS = (
     CONF_OPTION_CLOUD # force cloud address
 )
 
+# option for events over udp: when set (non zero) motion hooks send a single
+# datagram to this port (on the HA internal address) instead of calling the webhook
+CONF_EVENT_UDP_PORT = "event_udp_port"
+# (not an option) random key authenticating the udp events, generated once per entry
+CONF_EVENT_UDP_SECRET = "event_udp_secret"
+
 # option media_source: try to expose the motion target_dir as a media library path in HA
 CONF_MEDIASOURCE = "media_source"
 
@@ -62,6 +70,25 @@ CONF_ALARM_DISARMNIGHT_CAMERAS = "disarmnight_cameras"
 CONF_ALARM_DISARMBYPASS_CAMERAS = "disarmbypass_cameras"
 CONF_ALARM_PAUSE_DISARMED = "pause_disarmed" # if a camera is 'disarmed' pause motion detection
 
+# OptionsFlow: async_step_camera
+# tuning of camera entities image/stream handling
+CONF_SNAPSHOT_TTL = "snapshot_ttl" # seconds a fetched snapshot is served to any other request
+CONF_SNAPSHOT_TTL_DEFAULT = 1.0
+CONF_SNAPSHOT_CACHE_SIZE = "snapshot_cache_size" # KB of memory for cached snapshots (all the cameras)
+CONF_SNAPSHOT_CACHE_SIZE_DEFAULT = 16384
+CONF_SNAPSHOT_QUALITY = "snapshot_quality" # re-encode snapshots at this quality (0: keep original)
+CONF_SNAPSHOT_FORMAT = "snapshot_format" # encoding for served snapshots ('jpeg' or 'webp')
+CONF_STREAM_MAX_FPS = "stream_max_fps" # default frame rate cap for each stream viewer (0: unlimited)
+CONF_SNAPSHOT_PREFETCH = "snapshot_prefetch" # min seconds between snapshot prefetches on motion events (0: disabled)
+CONF_SNAPSHOT_PREFETCH_DEFAULT = 5.0
+CONF_STATE_WRITE_DELAY = "state_write_delay" # ms to gather entity state changes in a single write (0: same loop iteration)
+
+# OptionsFlow: async_step_retention
+# quotas enforced on local recordings (media_source enabled) for each camera
+CONF_RETENTION_MAX_AGE = "retention_max_age" # days to keep recordings (0: forever)
+CONF_RETENTION_MAX_SIZE = "retention_max_size" # MB of recordings for each camera (0: unlimited)
+CONF_RETENTION_CAMERAS = "retention_cameras" # cameras subject to quotas (empty: all)
+
 
 
 # a bunch of attributes to add to the state
@@ -90,5 +117,6 @@ also, ON_MOTION_DETECTED is pretty rough since it looks it get shot on every fra
 MANAGED_EVENTS = (
     ON_CAMERA_FOUND, ON_CAMERA_LOST,
     ON_EVENT_START, ON_EVENT_END,
-    ON_MOVIE_START, ON_MOVIE_END
+    ON_MOVIE_START, ON_MOVIE_END,
+    ON_PICTURE_SAVE # feeds the recordings catalog
 )
@@ -0,0 +1,173 @@
+"""
+Stores for camera snapshots
+
+Every camera keeps (at most) its last fetched image in the ImageCache. The
+whole store is bounded in size and, when full, the least recently used images
+get evicted first.
+The ImageDiskStore persists the last good image of every camera so that we
+have something to show after a restart or while the camera is offline.
+"""
+
+import asyncio
+from collections import OrderedDict
+from itertools import count
+import os
+import re
+from time import monotonic
+import typing
+
+from .helpers import LOGGER
+
+if typing.TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+
+_sequence = count()
+
+
+class CachedImage:
+    __slots__ = (
+        "image",
+        "time",
+        "seq",
+    )
+
+    def __init__(self, image: bytes, time: float | None = None):
+        self.image = image
+        self.time = monotonic() if time is None else time
+        # unique for every image stored (time is the same for all the stale ones)
+        self.seq = next(_sequence)
+
+    @property
+    def age(self) -> float:
+        return monotonic() - self.time
+
+
+class ImageCache:
+    __slots__ = (
+        "max_size",
+        "size",
+        "_entries",
+    )
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self._entries: OrderedDict[str, CachedImage] = OrderedDict()
+
+    def get(self, key: str) -> CachedImage | None:
+        if entry := self._entries.get(key):
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, image: bytes, stale: bool = False) -> CachedImage:
+        """
+        store image for key. stale images (i.e. loaded from disk)
+        are never considered fresh
+        """
+        entries = self._entries
+        if previous := entries.pop(key, None):
+            self.size -= len(previous.image)
+        entries[key] = entry = CachedImage(image, float("-inf") if stale else None)
+        self.size += len(image)
+        # always keep the newest even if it alone exceeds max_size
+        while (self.size > self.max_size) and (len(entries) > 1):
+            _, evicted = entries.popitem(last=False)
+            self.size -= len(evicted.image)
+        return entry
+
+    def pop(self, key: str) -> CachedImage | None:
+        if entry := self._entries.pop(key, None):
+            self.size -= len(entry.image)
+        return entry
+
+
+class ImageDiskStore:
+    MIN_WRITE_INTERVAL = 60  # seconds between writes of the same camera image
+
+    __slots__ = (
+        "hass",
+        "path",
+        "_last_write",
+        "_missing",
+        "_pending",
+        "_timers",
+    )
+
+    def __init__(self, hass: "HomeAssistant", path: str):
+        self.hass = hass
+        self.path = path
+        self._last_write: dict[str, float] = {}
+        # keys with nothing on disk: don't hit it again until saved
+        self._missing: set[str] = set()
+        self._pending: dict[str, bytes] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+
+    def _filename(self, key: str) -> str:
+        return os.path.join(self.path, re.sub(r"[^\w.-]", "_", key) + ".jpg")
+
+    async def async_load(self, key: str) -> bytes | None:
+        if image := self._pending.get(key):
+            return image  # not written yet
+        if key in self._missing:
+            return None
+
+        def _load():
+            try:
+                with open(self._filename(key), "rb") as file:
+                    return file.read()
+            except FileNotFoundError:
+                return None
+
+        try:
+            image = await self.hass.async_add_executor_job(_load)
+        except Exception as exception:
+            LOGGER.warning("Error (%s) loading cached image", str(exception))
+            return None
+        if (image is None) and (key not in self._last_write):
+            self._missing.add(key)  # (unless a write is still in flight)
+        return image
+
+    def save(self, key: str, image: bytes) -> None:
+        """
+        schedule the image to be written. Writes for the same key are
+        rate limited: the latest image in the interval is the one written
+        """
+        self._pending[key] = image
+        self._missing.discard(key)
+        if key in self._timers:
+            return
+        delay = self._last_write.get(key, -self.MIN_WRITE_INTERVAL) + (
+            self.MIN_WRITE_INTERVAL - monotonic()
+        )
+        if delay > 0:
+            self._timers[key] = self.hass.loop.call_later(delay, self._write, key)
+        else:
+            self._write(key)
+
+    async def async_flush(self) -> None:
+        """write any pending image now (i.e. when unloading)"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        pending = self._pending
+        self._pending = {}
+        for key, image in pending.items():
+            await self.hass.async_add_executor_job(self._write_file, key, image)
+
+    def _write(self, key: str) -> None:
+        self._timers.pop(key, None)
+        if (image := self._pending.pop(key, None)) is None:
+            return
+        self._last_write[key] = monotonic()
+        self.hass.async_add_executor_job(self._write_file, key, image)
+
+    def _write_file(self, key: str, image: bytes) -> None:
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            filename = self._filename(key)
+            with open(filename + ".tmp", "wb") as file:
+                file.write(image)
+            os.replace(filename + ".tmp", filename)
+        except Exception as exception:
+            LOGGER.warning("Error (%s) saving cached image", str(exception))
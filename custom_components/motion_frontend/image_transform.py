@@ -0,0 +1,153 @@
+"""
+Snapshot resizing/transcoding
+
+When the frontend asks for a smaller image (dashboard tiles, notifications..)
+we downscale the snapshot before sending it. Decoding/encoding is CPU bound so
+the work is offloaded to a small process pool (keeping both the event loop and
+the GIL free) running the jobs in image_worker. The jpeg decoder 'draft' mode
+is used so that big frames are decoded straight at a reduced scale.
+Produced variants are kept in a small LRU keyed by the source frame and the
+requested size so that many clients asking the same thumbnail cost one job.
+"""
+
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import find_spec, module_from_spec, spec_from_file_location
+import multiprocessing
+import os
+import site
+import sys
+import typing
+
+from .helpers import LOGGER
+
+# Pillow is only needed in the worker processes: don't load it in HA
+# (it ships with HA core but better be safe)
+HAS_PIL = find_spec("PIL") is not None
+
+if typing.TYPE_CHECKING:
+    from .image_cache import CachedImage
+
+
+IMAGE_FORMAT_JPEG = "jpeg"
+IMAGE_FORMAT_WEBP = "webp"
+IMAGE_FORMAT_OPTIONS = (IMAGE_FORMAT_JPEG, IMAGE_FORMAT_WEBP)
+IMAGE_CONTENT_TYPE = {
+    IMAGE_FORMAT_JPEG: "image/jpeg",
+    IMAGE_FORMAT_WEBP: "image/webp",
+}
+MAX_WORKERS = 2
+VARIANT_CACHE_SIZE = 32
+
+# the jobs are pickled by reference to their (top level) module which the
+# workers import from WORKER_PATH: this way they don't import this package
+WORKER_MODULE = "image_worker"
+WORKER_PATH = os.path.dirname(__file__)
+
+
+def _load_worker():
+    if (worker := sys.modules.get(WORKER_MODULE)) is None:
+        spec = spec_from_file_location(
+            WORKER_MODULE, os.path.join(WORKER_PATH, f"{WORKER_MODULE}.py")
+        )
+        worker = module_from_spec(spec)  # type: ignore
+        sys.modules[WORKER_MODULE] = worker
+        spec.loader.exec_module(worker)  # type: ignore
+    return worker
+
+
+_worker = _load_worker()
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # 'spawn' since forking the (threaded) HA process is unsafe
+        _executor = ProcessPoolExecutor(
+            max_workers=MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=site.addsitedir,
+            initargs=(WORKER_PATH,),
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def async_thumbnail(path: str, size: int) -> bytes | None:
+    if not HAS_PIL:
+        return None
+    return await asyncio.get_running_loop().run_in_executor(
+        _get_executor(), _worker.thumbnail_file, path, size, IMAGE_FORMAT_JPEG
+    )
+
+
+class ImageTransformer:
+    __slots__ = (
+        "quality",
+        "image_format",
+        "_variants",
+    )
+
+    def __init__(self, quality: int, image_format: str):
+        self.quality = quality
+        self.image_format = image_format
+        self._variants: OrderedDict[tuple, asyncio.Future[bytes]] = OrderedDict()
+
+    @property
+    def content_type(self) -> str:
+        if not HAS_PIL:
+            return IMAGE_CONTENT_TYPE[IMAGE_FORMAT_JPEG]
+        return IMAGE_CONTENT_TYPE[self.image_format]
+
+    @property
+    def transcode(self) -> bool:
+        """True when every image needs to be re-encoded (even at full size)"""
+        return HAS_PIL and (
+            bool(self.quality) or (self.image_format != IMAGE_FORMAT_JPEG)
+        )
+
+    async def async_transform(
+        self,
+        key: str,
+        cached: "CachedImage",
+        width: int | None,
+        height: int | None,
+    ) -> bytes:
+        if not HAS_PIL:
+            return cached.image
+
+        variant_key = (key, cached.seq, width, height)
+        variants = self._variants
+        if future := variants.get(variant_key):
+            variants.move_to_end(variant_key)
+        else:
+            future = asyncio.get_running_loop().run_in_executor(
+                _get_executor(),
+                _worker.transform_image,
+                cached.image,
+                width,
+                height,
+                self.quality,
+                self.image_format,
+            )
+            variants[variant_key] = future
+            while len(variants) > VARIANT_CACHE_SIZE:
+                variants.popitem(last=False)
+
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exception:
+            variants.pop(variant_key, None)
+            LOGGER.warning("Error (%s) transforming image for %s", str(exception), key)
+            return cached.image
@@ -0,0 +1,48 @@
+"""
+Image transform jobs run in the image_transform process pool
+
+This module is loaded standalone (as the top level 'image_worker') both in HA
+and in the spawned workers so that unpickling the jobs there doesn't import
+the integration package (and so HA). Keep it dependant only on the stdlib and
+Pillow and pass plain args only.
+"""
+
+from io import BytesIO
+
+DEFAULT_QUALITY = 75  # when re-encoding without an explicit quality
+
+
+def transform_image(
+    image: bytes,
+    width: int | None,
+    height: int | None,
+    quality: int,
+    image_format: str,
+) -> bytes:
+    """
+    scale the image to fit in width x height (never upscaling) and
+    encode it in image_format
+    """
+    from PIL import Image
+
+    with Image.open(BytesIO(image)) as img:
+        source_format = img.format
+        box = (width or img.width, height or img.height)
+        resize = (box[0] < img.width) or (box[1] < img.height)
+        if not resize and not quality and (source_format or "").lower() == image_format:
+            return image
+        if resize:
+            # let the jpeg decoder do the heavy lifting (DCT scaling)
+            img.draft("RGB", box)
+            img.thumbnail(box)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        output = BytesIO()
+        img.save(output, format=image_format, quality=quality or DEFAULT_QUALITY)
+        return output.getvalue()
+
+
+def thumbnail_file(path: str, size: int, image_format: str) -> bytes:
+    """load an image file scaling it to fit in size x size"""
+    with open(path, "rb") as file:
+        return transform_image(file.read(), size, size, 0, image_format)
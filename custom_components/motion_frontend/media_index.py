@@ -0,0 +1,449 @@
+"""
+In-memory index of the motion target_dir
+
+Browsing recordings used to walk the filesystem (exists/iterdir/is_file/
+guess_type for every child and a sort) on every request. Here we build a tree
+of the media files once (top level directories are scanned in parallel in the
+executor) and keep it current with inotify so that a browse is just a few
+dictionary lookups. Children are sorted once (lazily) and then kept sorted by
+bisection on every add/remove, and the media class of every file is computed
+once when indexed.
+When inotify is not available (non linux, exhausted watches) directories are
+revalidated on access by checking their mtime and rescanned only if changed.
+"""
+
+import asyncio
+from bisect import bisect_left
+import ctypes
+import ctypes.util
+import mimetypes
+import os
+import struct
+import typing
+
+from homeassistant.components.media_player.const import MEDIA_CLASS_DIRECTORY
+from homeassistant.components.media_source.const import (
+    MEDIA_CLASS_MAP,
+    MEDIA_MIME_TYPES,
+)
+
+from .helpers import LOGGER
+
+if typing.TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """minimal ctypes binding to the linux inotify api"""
+
+    __slots__ = (
+        "fd",
+        "_libc",
+    )
+
+    def __init__(self):
+        self._libc = libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def add_watch(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self) -> list[tuple[int, int, str]]:
+        """(wd, mask, name) for every pending event"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset : offset + length].split(b"\0", 1)[0]
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class MediaNode:
+    __slots__ = (
+        "name",
+        "mime_type",
+        "media_class",
+        "children",
+        "mtime",
+        "wd",
+        "_sorted",
+        "_keys",
+    )
+
+    def __init__(self, name: str, mime_type: str | None = None, media_class=None):
+        self.name = name
+        self.mime_type = mime_type
+        self.media_class = media_class or MEDIA_CLASS_DIRECTORY
+        # directories only (files keep None)
+        self.children: dict[str, MediaNode] | None = None if mime_type else {}
+        self.mtime: int | None = None  # None means not scanned yet
+        self.wd = -1
+        self._sorted: list[MediaNode] | None = None
+        self._keys: list[tuple[bool, str]] | None = None
+
+    @property
+    def is_dir(self) -> bool:
+        return self.children is not None
+
+    @property
+    def sort_key(self) -> tuple[bool, str]:
+        """directories first, then by name"""
+        return (self.children is None, self.name)
+
+    @property
+    def sorted_children(self) -> "list[MediaNode]":
+        self._sort()
+        return self._sorted  # type: ignore
+
+    def index(self, name: str) -> int:
+        """position of name in sorted_children (or where it would be)"""
+        keys = self._sort()
+        child = self.children.get(name)  # type: ignore
+        # when missing (deleted meanwhile) it was most likely a file
+        return bisect_left(keys, ((child is None) or (child.children is None), name))
+
+    def _sort(self) -> list[tuple[bool, str]]:
+        """(full) sort if needed: add/remove keep it current afterwards"""
+        if self._keys is None:
+            self._sorted = sorted(
+                self.children.values(),  # type: ignore
+                key=lambda node: node.sort_key,
+            )
+            self._keys = [node.sort_key for node in self._sorted]
+        return self._keys
+
+    def set_children(self, children: "dict[str, MediaNode]") -> None:
+        self.children = children
+        self._sorted = self._keys = None  # full sort on next access
+
+    def add(self, node: "MediaNode") -> None:
+        """add (or replace) node keeping the sorted view current"""
+        if node.name in self.children:  # type: ignore
+            self.remove(node.name)
+        self.children[node.name] = node  # type: ignore
+        if (keys := self._keys) is not None:
+            key = node.sort_key
+            i = bisect_left(keys, key)
+            keys.insert(i, key)
+            self._sorted.insert(i, node)  # type: ignore
+
+    def remove(self, name: str) -> "MediaNode | None":
+        node = self.children.pop(name, None)  # type: ignore
+        if node and ((keys := self._keys) is not None):
+            i = bisect_left(keys, node.sort_key)
+            if (i < len(keys)) and (self._sorted[i] is node):  # type: ignore
+                del keys[i]
+                del self._sorted[i]  # type: ignore
+            else:
+                self._sorted = self._keys = None  # shouldn't happen
+        return node
+
+
+def file_node(name: str) -> MediaNode | None:
+    """build the node for a file or None if it is not media"""
+    mime_type, _ = mimetypes.guess_type(name)
+    if not mime_type:
+        return None
+    media_type = mime_type.split("/")[0]
+    if media_type not in MEDIA_MIME_TYPES:
+        return None
+    return MediaNode(name, mime_type, MEDIA_CLASS_MAP.get(media_type))
+
+
+class MediaIndex:
+    __slots__ = (
+        "hass",
+        "root_path",
+        "root",
+        "_inotify",
+        "_watches",
+        "_build",
+        "_scanning",
+        "_stashed_events",
+    )
+
+    def __init__(self, hass: "HomeAssistant", root_path: str):
+        self.hass = hass
+        self.root_path = root_path
+        self.root: MediaNode | None = None
+        self._inotify: Inotify | None = None
+        self._watches: dict[int, tuple[str, MediaNode]] = {}
+        self._build: asyncio.Task | None = None
+        # executor scans in progress: their watches are not registered yet
+        self._scanning = 0
+        # events for (yet) unknown watches received while scanning
+        self._stashed_events: list[tuple[int, int, str]] = []
+
+    @property
+    def ready(self) -> bool:
+        return self.root is not None
+
+    def start(self) -> None:
+        try:
+            inotify = Inotify()
+        except Exception as exception:
+            LOGGER.info(
+                "inotify not available (%s): media index will revalidate on access",
+                str(exception),
+            )
+        else:
+            self._inotify = inotify
+            self.hass.loop.add_reader(inotify.fd, self._handle_events)
+        self._rebuild()
+
+    def close(self) -> None:
+        if self._build:
+            self._build.cancel()
+            self._build = None
+        if inotify := self._inotify:
+            self._inotify = None
+            self.hass.loop.remove_reader(inotify.fd)
+            inotify.close()
+        self._watches.clear()
+        self._stashed_events.clear()
+        self.root = None
+
+    async def async_get(self, relativepath: str | None) -> MediaNode | None:
+        """return the node at relativepath (None if missing)"""
+        if self._inotify is None:
+            return await self._async_revalidate_get(relativepath)
+        node = self.root
+        if relativepath:
+            for name in relativepath.split("/"):
+                if (node is None) or (node.children is None):
+                    return None
+                node = node.children.get(name)
+        return node
+
+    def _rebuild(self) -> None:
+        if self._build:
+            self._build.cancel()
+        self._build = self.hass.async_create_background_task(
+            self._async_build(), "motion_frontend media index"
+        )
+
+    async def _async_build(self):
+        if inotify := self._inotify:
+            for wd in self._watches:
+                inotify.rm_watch(wd)
+            self._watches.clear()
+        self._scanning += 1
+        try:
+            root = await self._async_scan(self.root_path, False)
+            # the bulk of the work: one job per top level directory
+            subdirs = [
+                name for name, node in root.children.items() if node.is_dir  # type: ignore
+            ]
+            results = await asyncio.gather(
+                *(
+                    self._async_scan(os.path.join(self.root_path, name), True)
+                    for name in subdirs
+                ),
+                return_exceptions=True,
+            )
+            children = dict(root.children)  # type: ignore
+            for name, result in zip(subdirs, results):
+                if isinstance(result, MediaNode):
+                    children[name] = result
+                else:
+                    children.pop(name)  # gone meanwhile
+            root.set_children(children)
+            self._register(self.root_path, root)
+            self.root = root
+            self._build = None
+            LOGGER.debug("Media index for %s ready", self.root_path)
+        except OSError as exception:
+            LOGGER.warning("Error (%s) indexing media", str(exception))
+        finally:
+            self._scanning -= 1
+        self._replay_events()
+
+    async def _async_scan(self, path: str, recursive: bool) -> MediaNode:
+        return await self.hass.async_add_executor_job(self._scan, path, recursive)
+
+    def _scan(self, path: str, recursive: bool) -> MediaNode:
+        """
+        build a (detached) node for path. Runs in the executor so it must not
+        touch the index: the loop attaches the result (see _register)
+        """
+        node = MediaNode(os.path.basename(path))
+        if inotify := self._inotify:
+            # watch before listing so that we don't miss anything in between
+            try:
+                node.wd = inotify.add_watch(path)
+            except OSError as exception:
+                LOGGER.warning("Error (%s) watching %s", str(exception), path)
+        node.mtime = os.stat(path).st_mtime_ns
+        children: dict[str, MediaNode] = {}
+        with os.scandir(path) as entries:
+            for entry in entries:
+                name = entry.name
+                try:
+                    # don't follow symlinks to directories: they could loop
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            child = self._scan(entry.path, True)
+                        else:
+                            child = MediaNode(name)
+                    elif entry.is_file():
+                        if (child := file_node(name)) is None:
+                            continue
+                    else:
+                        continue
+                except OSError:
+                    continue
+                children[name] = child
+        node.set_children(children)
+        return node
+
+    def _register(self, path: str, node: MediaNode) -> None:
+        """track the watches of a freshly scanned subtree"""
+        if node.wd >= 0:
+            self._watches[node.wd] = (path, node)
+        for child in node.children.values():  # type: ignore
+            if (child.children is not None) and (child.mtime is not None):
+                self._register(os.path.join(path, child.name), child)
+
+    async def _async_revalidate_get(self, relativepath: str | None) -> MediaNode | None:
+        """
+        walk down to relativepath rescanning (shallowly) any directory
+        whose mtime changed (no inotify)
+        """
+        node = self.root
+        path = self.root_path
+        names = relativepath.split("/") if relativepath else []
+        while True:
+            if node is None:
+                return None
+            if node.children is None:
+                return node if not names else None
+            try:
+                scanned = await self.hass.async_add_executor_job(
+                    self._rescan, path, node.mtime
+                )
+            except OSError:
+                return None
+            if scanned:
+                # keep the subdirectories we already know (revalidated on access)
+                previous = node.children
+                children = scanned.children  # type: ignore
+                for name, child in children.items():
+                    if child.is_dir and (known := previous.get(name)) and known.is_dir:
+                        children[name] = known
+                node.mtime = scanned.mtime
+                node.set_children(children)
+            if not names:
+                return node
+            name = names.pop(0)
+            node = node.children.get(name)
+            path = os.path.join(path, name)
+
+    def _rescan(self, path: str, mtime: int | None) -> MediaNode | None:
+        if os.stat(path).st_mtime_ns == mtime:
+            return None
+        return self._scan(path, False)
+
+    def _unwatch(self, node: MediaNode) -> None:
+        if node.wd >= 0:
+            self._watches.pop(node.wd, None)
+            if self._inotify:
+                self._inotify.rm_watch(node.wd)
+            node.wd = -1
+        for child in (node.children or {}).values():
+            if child.children is not None:
+                self._unwatch(child)
+
+    def _handle_events(self) -> None:
+        if inotify := self._inotify:
+            self._process_events(inotify.read_events())
+
+    def _process_events(self, events: list[tuple[int, int, str]]) -> None:
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                LOGGER.debug("inotify queue overflow: rebuilding media index")
+                self._rebuild()
+                return
+            if (watch := self._watches.get(wd)) is None:
+                if self._scanning:
+                    # the watch could belong to a scan not yet registered
+                    self._stashed_events.append((wd, mask, name))
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if not name:
+                continue
+            path, node = watch
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                if (removed := node.remove(name)) and (removed.children is not None):
+                    self._unwatch(removed)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                if mask & IN_ISDIR:
+                    child = MediaNode(name)
+                    if (previous := node.remove(name)) and previous.is_dir:
+                        self._unwatch(previous)
+                    node.add(child)
+                    self.hass.async_create_background_task(
+                        self._async_scan_child(os.path.join(path, name), node, child),
+                        "motion_frontend media index scan",
+                    )
+                elif child := file_node(name):
+                    node.add(child)
+
+    async def _async_scan_child(
+        self, path: str, parent: MediaNode, placeholder: MediaNode
+    ) -> None:
+        self._scanning += 1
+        try:
+            child = await self._async_scan(path, True)
+        except OSError:
+            pass  # gone already: the delete event will clean up
+        else:
+            if parent.children.get(placeholder.name) is placeholder:  # type: ignore
+                parent.remove(placeholder.name)
+                parent.add(child)
+                self._register(path, child)
+            else:
+                self._unwatch(child)  # removed (or replaced) meanwhile
+        finally:
+            self._scanning -= 1
+        self._replay_events()
+
+    def _replay_events(self) -> None:
+        if self._scanning or not self._stashed_events:
+            return
+        events = self._stashed_events
+        self._stashed_events = []
+        self._process_events(events)
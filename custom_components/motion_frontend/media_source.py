@@ -0,0 +1,533 @@
+"""
+    Local Media Source Implementation.
+
+    This code allows to browse motion recordings on a local path
+    exposing the contents of the filesystem in motion 'target_dir'
+    into the HA media browser UI (together with a few virtual trees
+    backed by the recordings catalog)
+
+    Playback doesn't go through the default '/media' url (which only looks
+    through configured paths in 'hass.config.media_dirs') but through our own
+    view which serves the files with Range/conditional requests support
+    (aiohttp FileResponse uses sendfile when available) so that seeking in a
+    long movie only reads the needed bytes.
+    The 'target_dir' is still injected into the HA media_dirs when configuring
+    the motion config entry since other parts (entities 'filename' attribute)
+    rely on it.
+"""
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+import mimetypes
+import os
+from pathlib import Path
+import sqlite3
+import typing
+from urllib.parse import quote
+
+from aiohttp import hdrs, web
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.components.media_player.const import (
+    MEDIA_CLASS_DIRECTORY,
+    MEDIA_CLASS_VIDEO,
+    MEDIA_TYPE_VIDEO,
+)
+from homeassistant.components.media_player.errors import BrowseError
+from homeassistant.components.media_source.const import (
+    MEDIA_CLASS_MAP,
+    MEDIA_MIME_TYPES,
+)
+from homeassistant.components.media_source.error import MediaSourceError, Unresolvable
+from homeassistant.components.media_source.models import (
+    BrowseMediaSource,
+    MediaSource,
+    MediaSourceItem,
+    PlayMedia,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util, raise_if_invalid_path
+
+from .const import DOMAIN
+from .media_thumbnail import (
+    THUMBNAIL_URL,
+    MotionThumbnailView,
+    ThumbnailStore,
+    media_type,
+    resolve_media_path,
+)
+from .motionclient import config_schema as cs
+
+if typing.TYPE_CHECKING:
+    # the index is only loaded when a media source is configured
+    from .media_index import MediaNode
+
+PAGE_SIZE = 200  # max children listed in a browse response
+PAGE_PREFIX = "@page="
+BY_CAMERA = "@camera"  # virtual roots backed by the recordings catalog
+BY_DAY = "@day"
+RECORDING_URL = f"/api/{DOMAIN}/recording"
+
+
+async def async_get_media_source(hass: HomeAssistant):
+    """Set up motion recordings media source."""
+    source = MotionRecordSource(hass)
+    hass.http.register_view(MotionThumbnailView(hass, source.thumbnails))
+    hass.http.register_view(MotionRecordingView(hass))
+    return source
+
+
+class MotionRecordingView(HomeAssistantView):
+    """Serve recordings (Range, If-Modified-Since and sendfile by FileResponse)"""
+
+    url = RECORDING_URL + "/{entry_id}/{location:.*}"
+    name = f"api:{DOMAIN}:recording"
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+
+    async def get(self, request: web.Request, entry_id: str, location: str):
+        api = self.hass.data.get(DOMAIN, {}).get(entry_id)
+        # only set when the media source is enabled and target_dir is local
+        if (api is None) or not api.media_dir_id:
+            raise web.HTTPNotFound()
+        if not (target_dir := api.config.get(cs.TARGET_DIR)):
+            raise web.HTTPNotFound()
+        try:
+            raise_if_invalid_path(location)
+        except ValueError as err:
+            raise web.HTTPBadRequest() from err
+        if media_type(location) not in MEDIA_MIME_TYPES:
+            raise web.HTTPNotFound()
+        path = await self.hass.async_add_executor_job(
+            resolve_media_path, str(target_dir), location
+        )
+        if path is None:
+            raise web.HTTPNotFound()
+
+        # recordings never change once written (but the last one could be growing)
+        return web.FileResponse(
+            path,
+            headers={hdrs.CACHE_CONTROL: "private, no-cache"},
+        )
+
+
+class ItemInfo:
+
+    def __init__(self, entry_id: str, target_dir: str, relativepath: str):
+        self.entry_id: str = entry_id
+        self.target_dir: str = target_dir
+        self.relativepath: str | None = relativepath
+        self.path: Path = Path(target_dir, relativepath) if relativepath else Path(target_dir)
+
+
+class MotionRecordSource(MediaSource):
+    """Provide access to motion server recordings"""
+
+    name: str = "Motion Server"
+
+
+    def __init__(self, hass: HomeAssistant):
+        super().__init__(DOMAIN)
+        self.hass = hass
+        self.thumbnails = ThumbnailStore(hass, hass.config.path(DOMAIN, "thumbnails"))
+
+
+    @callback
+    def async_parse_identifier(self, item: MediaSourceItem) -> ItemInfo:
+        """Parse identifier."""
+        if not item.identifier:
+            raise Unresolvable("Invalid path.")
+
+        split = item.identifier.split("/", 1)
+
+        entry_id = split[0]
+
+        api = self.hass.data[DOMAIN].get(entry_id)
+        if api is None:
+            raise Unresolvable(f"Missing {DOMAIN} configuration entry.")
+        if not api.media_dir_id:
+            raise Unresolvable("Media source not enabled for this motion server.")
+
+        target_dir = api.config.get(cs.TARGET_DIR)
+        if not target_dir:
+            raise Unresolvable("Missing motion target_dir.")
+
+        iteminfo = ItemInfo(entry_id, str(target_dir), split[1] if len(split) > 1 else None)
+
+        try:
+            raise_if_invalid_path(str(iteminfo.path))
+        except ValueError as err:
+            raise Unresolvable("Invalid path.") from err
+
+        return iteminfo
+
+
+    async def async_resolve_media(self, item: MediaSourceItem) -> PlayMedia:
+        """Resolve media to a url."""
+        iteminfo = self.async_parse_identifier(item)
+        mime_type, _ = mimetypes.guess_type(str(iteminfo.path))
+        if not iteminfo.relativepath or not mime_type:
+            raise Unresolvable("Not a recording.")
+        # raw path: the media_source websocket quotes it when signing (as for local_source)
+        return PlayMedia(
+            f"{RECORDING_URL}/{iteminfo.entry_id}/{iteminfo.relativepath}",
+            mime_type,
+        )
+
+
+    async def async_browse_media(
+        self, item: MediaSourceItem, media_types: tuple[str] = MEDIA_MIME_TYPES
+    ) -> BrowseMediaSource:
+
+        # root node for motion_frontend media
+        # add a child for each configured server
+        if item.identifier is None:
+            base = BrowseMediaSource(
+                domain=DOMAIN,
+                identifier="",
+                media_class=MEDIA_CLASS_DIRECTORY,
+                media_content_type=None,
+                title=self.name,
+                can_play=False,
+                can_expand=True,
+                children_media_class=MEDIA_CLASS_DIRECTORY,
+            )
+
+            base.children = [
+                BrowseMediaSource(
+                    domain=DOMAIN,
+                    identifier=entry_id,
+                    media_class=MEDIA_CLASS_DIRECTORY,
+                    media_content_type=None,
+                    title=api.unique_id,
+                    can_play=False,
+                    can_expand=True,
+                )
+                for entry_id, api in self.hass.data[DOMAIN].items()
+                if api.media_dir_id
+            ]
+
+            return base
+
+
+        try:
+            iteminfo: ItemInfo = self.async_parse_identifier(item)
+        except Unresolvable as err:
+            raise BrowseError(str(err)) from err
+
+        api = self.hass.data[DOMAIN][iteminfo.entry_id]
+        if iteminfo.relativepath and (
+            iteminfo.relativepath.split("/", 1)[0] in (BY_CAMERA, BY_DAY)
+        ):
+            if not api.catalog:
+                raise BrowseError("Recordings catalog not available.")
+            return await self._async_browse_catalog(iteminfo, api)
+
+        page = None
+        media_index = api.media_index
+        if media_index and media_index.ready:
+            # big directories are split in (synthetic) pages
+            relativepath, _, page = (iteminfo.relativepath or "").rpartition("/")
+            if page.startswith(PAGE_PREFIX):
+                iteminfo.relativepath = relativepath
+            else:
+                relativepath = iteminfo.relativepath or ""
+                page = None
+            node = await media_index.async_get(relativepath)
+            if node is None:
+                raise BrowseError("Path does not exist.")
+            media = self._build_node_response(iteminfo, node, page)
+        else:
+            # index not (yet) available: walk the filesystem
+            media = await self.hass.async_add_executor_job(self._browse_media, iteminfo)
+
+        # only on the first page of the root
+        if (not iteminfo.relativepath) and (page is None) and api.catalog:
+            media.children[:0] = [
+                self._build_catalog_media(f"{iteminfo.entry_id}/{BY_CAMERA}", "By camera"),
+                self._build_catalog_media(f"{iteminfo.entry_id}/{BY_DAY}", "By day"),
+            ]
+        return media
+
+
+    def _build_catalog_media(
+        self, identifier: str, title: str, thumbnail: str | None = None
+    ) -> BrowseMediaSource:
+        return BrowseMediaSource(
+            domain=DOMAIN,
+            identifier=identifier,
+            media_class=MEDIA_CLASS_DIRECTORY,
+            media_content_type="",
+            title=title,
+            can_play=False,
+            can_expand=True,
+            thumbnail=thumbnail,
+        )
+
+
+    def _build_recording_media(
+        self, iteminfo: ItemInfo, path: str
+    ) -> BrowseMediaSource | None:
+        """a catalog entry as a playable item (if inside target_dir)"""
+        # (normally) already loaded by the media source setup
+        from .media_index import file_node
+
+        prefix = iteminfo.target_dir.rstrip("/") + "/"
+        if not path.startswith(prefix):
+            return None
+        relativepath = path[len(prefix) :]
+        if (node := file_node(relativepath.rpartition("/")[2])) is None:
+            return None
+        return self._build_node_media(iteminfo.entry_id, relativepath, node)
+
+
+    async def _async_browse_catalog(self, iteminfo: ItemInfo, api) -> BrowseMediaSource:
+        """
+        virtual trees backed by the recordings catalog:
+        '@camera/<camera>/<day>/<event>' and '@day/<day>/<camera>/<event>'
+        """
+        catalog = api.catalog
+        entry_id = iteminfo.entry_id
+        identifier = f"{entry_id}/{iteminfo.relativepath}"
+        parts = iteminfo.relativepath.split("/")  # type: ignore
+        root = parts[0]
+        if root == BY_CAMERA:
+            camera, day, event = (parts[1:] + [None, None, None])[:3]
+        else:
+            day, camera, event = (parts[1:] + [None, None, None])[:3]
+
+        def _camera_title(camera_id: str) -> str:
+            camera = api.cameras.get(camera_id)
+            return camera.name if camera else camera_id
+
+        async def _async_days(camera: str | None = None) -> list[str]:
+            # the slots (quarters of an hour) never straddle a local midnight
+            days = {
+                dt_util.as_local(datetime.fromtimestamp(slot, UTC)).strftime("%Y-%m-%d")
+                for slot in await catalog.async_start_times(camera)
+            }
+            return sorted(days, reverse=True)
+
+        try:
+            if day:
+                date = datetime.strptime(day, "%Y-%m-%d").date()
+                # local midnights (days are not always 24h long)
+                start_time = dt_util.start_of_local_day(date).timestamp()
+                end_time = dt_util.start_of_local_day(
+                    date + timedelta(days=1)
+                ).timestamp()
+            if event:
+                event_start = float(event)
+        except ValueError as err:
+            raise BrowseError("Invalid path.") from err
+
+        try:
+            if event:
+                recordings = await catalog.async_event_recordings(camera, event_start)
+                media = self._build_catalog_media(
+                    identifier,
+                    dt_util.as_local(dt_util.utc_from_timestamp(event_start)).strftime("%X"),
+                )
+                media.children = [
+                    child
+                    for recording in recordings
+                    if (child := self._build_recording_media(iteminfo, recording.path))
+                ]
+                return media
+
+            if camera and day:
+                media = self._build_catalog_media(
+                    identifier, f"{_camera_title(camera)} {day}"
+                )
+                media.children = []
+                for event_start, event_id, count, first in await catalog.async_events(
+                    camera, start_time, end_time
+                ):
+                    time_title = dt_util.as_local(
+                        dt_util.utc_from_timestamp(event_start)
+                    ).strftime("%X")
+                    first_media = self._build_recording_media(iteminfo, first)
+                    media.children.append(
+                        self._build_catalog_media(
+                            f"{identifier}/{event_start!r}",
+                            f"{time_title} #{event_id} ({count})",
+                            first_media.thumbnail if first_media else None,
+                        )
+                    )
+                return media
+
+            if root == BY_CAMERA:
+                if camera:
+                    media = self._build_catalog_media(identifier, _camera_title(camera))
+                    children = [
+                        (day, day)
+                        for day in await _async_days(camera)
+                    ]
+                else:
+                    media = self._build_catalog_media(identifier, "By camera")
+                    children = [
+                        (camera, _camera_title(camera))
+                        for camera in await catalog.async_cameras()
+                    ]
+            elif day:
+                media = self._build_catalog_media(identifier, day)
+                children = [
+                    (camera, _camera_title(camera))
+                    for camera in await catalog.async_day_cameras(start_time, end_time)
+                ]
+            else:
+                media = self._build_catalog_media(identifier, "By day")
+                children = [(day, day) for day in await _async_days()]
+        except (RuntimeError, sqlite3.Error) as err:
+            raise BrowseError(str(err)) from err
+
+        media.children = [
+            self._build_catalog_media(f"{identifier}/{name}", title)
+            for name, title in children
+        ]
+        return media
+
+
+    def _build_node_media(
+        self, entry_id: str, relativepath: str, node: MediaNode
+    ) -> BrowseMediaSource:
+        is_dir = node.is_dir
+        return BrowseMediaSource(
+            domain=DOMAIN,
+            identifier=f"{entry_id}/{relativepath}",
+            media_class=node.media_class,
+            media_content_type=node.mime_type or "",
+            title=f"{node.name}/" if is_dir else node.name,
+            can_play=not is_dir,
+            can_expand=is_dir,
+            thumbnail=None
+            if is_dir
+            else f"{THUMBNAIL_URL}/{entry_id}/{quote(relativepath)}",
+        )
+
+
+    def _build_page_media(
+        self, entry_id: str, prefix: str, children: list[MediaNode], start: int, count: int
+    ) -> BrowseMediaSource:
+        first = children[start].name
+        return BrowseMediaSource(
+            domain=DOMAIN,
+            identifier=f"{entry_id}/{prefix}{PAGE_PREFIX}{count}:{first}",
+            media_class=MEDIA_CLASS_DIRECTORY,
+            media_content_type="",
+            title=f"{first} … {children[start + count - 1].name}",
+            can_play=False,
+            can_expand=True,
+        )
+
+
+    def _build_node_response(
+        self, iteminfo: ItemInfo, node: MediaNode, page: str | None = None
+    ):
+        entry_id = iteminfo.entry_id
+        relativepath = iteminfo.relativepath or ""
+        prefix = f"{relativepath}/" if relativepath else ""
+        if not node.is_dir:
+            return self._build_node_media(entry_id, relativepath, node)
+
+        children = node.sorted_children
+        if page is None:
+            media = self._build_node_media(entry_id, relativepath, node)
+            start = 0
+            end = len(children)
+        else:
+            # page identifiers are '@page=<count>:<first child name>'
+            count, _, first = page[len(PAGE_PREFIX) :].partition(":")
+            try:
+                count = int(count)
+            except ValueError as err:
+                raise BrowseError("Invalid page.") from err
+            start = node.index(first)
+            end = min(start + count, len(children))
+            if start >= end:
+                raise BrowseError("Path does not exist.")
+            media = self._build_page_media(entry_id, prefix, children, start, end - start)
+
+        count = end - start
+        if count <= PAGE_SIZE:
+            media.children = [
+                self._build_node_media(entry_id, prefix + child.name, child)
+                for child in children[start:end]
+            ]
+        else:
+            # at most PAGE_SIZE sub pages each spanning a power of PAGE_SIZE
+            step = PAGE_SIZE
+            while step * PAGE_SIZE < count:
+                step *= PAGE_SIZE
+            media.children = [
+                self._build_page_media(
+                    entry_id, prefix, children, index, min(step, end - index)
+                )
+                for index in range(start, end, step)
+            ]
+        return media
+
+
+    def _browse_media(self, iteminfo: ItemInfo):
+        # iteminfo = (entry_id, target_dir, path)
+
+        if not iteminfo.path.exists():
+            raise BrowseError("Path does not exist.")
+
+        return self._build_item_response(iteminfo, iteminfo.path)
+
+
+    def _build_item_response(self, iteminfo: ItemInfo, path: Path, is_child=False):
+        mime_type, _ = mimetypes.guess_type(str(path))
+        is_file = path.is_file()
+        is_dir = path.is_dir()
+
+        # Make sure it's a file or directory
+        if not is_file and not is_dir:
+            return None
+
+        # Check that it's a media file
+        if is_file and (
+            not mime_type or mime_type.split("/")[0] not in MEDIA_MIME_TYPES
+        ):
+            return None
+
+        title = path.name
+        if is_dir:
+            title += "/"
+
+        media_class = MEDIA_CLASS_MAP.get(
+            mime_type and mime_type.split("/")[0], MEDIA_CLASS_DIRECTORY
+        )
+
+        relativepath = path.relative_to(iteminfo.target_dir)
+        media = BrowseMediaSource(
+            domain=DOMAIN,
+            identifier=f"{iteminfo.entry_id}/{relativepath}",
+            media_class=media_class,
+            media_content_type=mime_type or "",
+            title=title,
+            can_play=is_file,
+            can_expand=is_dir,
+            # built lazily (and cached) when the browser asks for it
+            thumbnail=f"{THUMBNAIL_URL}/{iteminfo.entry_id}/{quote(str(relativepath))}"
+            if is_file
+            else None,
+        )
+
+        if is_file or is_child:
+            return media
+
+        # Append first level children
+        media.children = []
+        for child_path in path.iterdir():
+            child = self._build_item_response(iteminfo, child_path, True)
+            if child:
+                media.children.append(child)
+
+        # Sort children showing directories first, then by name
+        media.children.sort(key=lambda child: (child.can_play, child.title))
+
+        return media
+
+
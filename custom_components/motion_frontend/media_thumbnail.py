@@ -0,0 +1,203 @@
+"""
+Thumbnails for recordings browsed through the media source
+
+Pictures are downscaled in the image_transform worker pool while movies get
+the thumbnail of the companion picture motion saved for the same event
+(picture_output 'first'/'best'/..), looked up in the recordings catalog.
+Built thumbnails are stored on disk keyed by the recording path and mtime so
+they're computed once and automatically invalidated when the recording changes.
+"""
+
+import asyncio
+import hashlib
+import mimetypes
+import os
+import typing
+
+from aiohttp import hdrs, web
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.util import raise_if_invalid_path
+
+from .const import DOMAIN
+from .helpers import LOGGER
+from .image_transform import async_thumbnail
+from .motionclient import config_schema as cs
+
+if typing.TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+    from .recording_catalog import RecordingCatalog
+
+
+THUMBNAIL_SIZE = 256
+THUMBNAIL_URL = f"/api/{DOMAIN}/thumbnail"
+
+
+def media_type(path: str) -> str | None:
+    """'image', 'video',.. or None"""
+    mime_type, _ = mimetypes.guess_type(path)
+    return mime_type.split("/")[0] if mime_type else None
+
+
+def resolve_media_path(target_dir: str, location: str) -> str | None:
+    """
+    the real path of location (relative to target_dir) or None when it
+    would end up outside target_dir (absolute paths, '..', symlinks..).
+    Hits the disk (realpath) so run it in the executor
+    """
+    if os.path.isabs(location):
+        return None
+    root = os.path.realpath(target_dir)
+    path = os.path.realpath(os.path.join(root, location))
+    if not path.startswith(os.path.join(root, "")):
+        return None
+    return path
+
+
+def find_companion_picture(movie: str) -> str | None:
+    """
+    look for the picture saved along with a movie. motion default naming
+    (movie '%v-%Y%m%d%H%M%S', picture '%v-%Y%m%d%H%M%S-%q') means the picture
+    either starts with the movie name or at least shares the event prefix:
+    in the latter case we take the closest in time.
+    This scans the whole directory: only a fallback for movies the catalog
+    doesn't know about
+    """
+    dirname, basename = os.path.split(movie)
+    stem = os.path.splitext(basename)[0]
+    event_prefix = stem.partition("-")[0] + "-"
+    movie_mtime = os.stat(movie).st_mtime
+    best = None
+    best_delta = None
+    with os.scandir(dirname) as entries:
+        for entry in entries:
+            name = entry.name
+            if not name.startswith(event_prefix) or media_type(name) != "image":
+                continue
+            if name.startswith(stem):
+                return entry.path
+            delta = abs(entry.stat().st_mtime - movie_mtime)
+            if (best_delta is None) or (delta < best_delta):
+                best = entry.path
+                best_delta = delta
+    return best
+
+
+class ThumbnailStore:
+    __slots__ = (
+        "hass",
+        "path",
+        "_pending",
+    )
+
+    def __init__(self, hass: "HomeAssistant", path: str):
+        self.hass = hass
+        self.path = path
+        self._pending: dict[str, asyncio.Future[str | None]] = {}
+
+    def _lookup(self, source: str) -> tuple[str, bool]:
+        """(thumbnail path, thumbnail exists) for source (picture or movie)"""
+        stat = os.stat(source)
+        key = hashlib.sha1(f"{source}:{stat.st_mtime_ns}".encode()).hexdigest()
+        thumbnail = os.path.join(self.path, key[:2], key + ".jpg")
+        return thumbnail, os.path.isfile(thumbnail)
+
+    async def _async_companion_picture(
+        self, source: str, catalog: "RecordingCatalog | None", path: str | None
+    ) -> str | None:
+        if catalog and path:
+            try:
+                paths = await catalog.async_event_paths(path)
+            except RuntimeError:
+                paths = []  # catalog closed
+            for event_path in paths:
+                if media_type(event_path) == "image":
+                    return event_path
+            if paths:
+                return None  # no picture saved for this event
+        return await self.hass.async_add_executor_job(find_companion_picture, source)
+
+    def _save(self, thumbnail: str, image: bytes) -> None:
+        os.makedirs(os.path.dirname(thumbnail), exist_ok=True)
+        with open(thumbnail + ".tmp", "wb") as file:
+            file.write(image)
+        os.replace(thumbnail + ".tmp", thumbnail)
+
+    async def async_get(
+        self,
+        source: str,
+        catalog: "RecordingCatalog | None" = None,
+        path: str | None = None,
+    ) -> str | None:
+        """
+        return the path of the thumbnail file for source (building it if needed).
+        path is the recording as known to the catalog (i.e. not resolved)
+        """
+        source_type = media_type(source)
+        if source_type not in ("image", "video"):
+            return None
+        try:
+            thumbnail, exists = await self.hass.async_add_executor_job(
+                self._lookup, source
+            )
+        except OSError:
+            return None
+        if exists:
+            return thumbnail
+
+        # many tiles of the same browse page could ask for it at once
+        if future := self._pending.get(thumbnail):
+            return await asyncio.shield(future)
+        future = self._pending[thumbnail] = self.hass.loop.create_future()
+        result = None
+        try:
+            picture = source
+            if source_type == "video":
+                picture = await self._async_companion_picture(source, catalog, path)
+            if picture and (image := await async_thumbnail(picture, THUMBNAIL_SIZE)):
+                await self.hass.async_add_executor_job(self._save, thumbnail, image)
+                result = thumbnail
+        except Exception as exception:
+            LOGGER.warning(
+                "Error (%s) building thumbnail for %s", str(exception), source
+            )
+        finally:
+            self._pending.pop(thumbnail, None)
+            future.set_result(result)
+        return result
+
+
+class MotionThumbnailView(HomeAssistantView):
+    url = THUMBNAIL_URL + "/{entry_id}/{location:.*}"
+    name = f"api:{DOMAIN}:thumbnail"
+
+    def __init__(self, hass: "HomeAssistant", store: ThumbnailStore):
+        self.hass = hass
+        self.store = store
+
+    async def get(self, request: web.Request, entry_id: str, location: str):
+        api = self.hass.data.get(DOMAIN, {}).get(entry_id)
+        # only set when the media source is enabled and target_dir is local
+        if (api is None) or not api.media_dir_id:
+            raise web.HTTPNotFound()
+        if not (target_dir := api.config.get(cs.TARGET_DIR)):
+            raise web.HTTPNotFound()
+        try:
+            raise_if_invalid_path(location)
+        except ValueError as err:
+            raise web.HTTPBadRequest() from err
+
+        source = await self.hass.async_add_executor_job(
+            resolve_media_path, str(target_dir), location
+        )
+        if source is None:
+            raise web.HTTPNotFound()
+        thumbnail = await self.store.async_get(
+            source, api.catalog, os.path.join(str(target_dir), location)
+        )
+        if thumbnail is None:
+            raise web.HTTPNotFound()
+        # content never changes for a given url unless the recording does
+        return web.FileResponse(
+            thumbnail, headers={hdrs.CACHE_CONTROL: "private, max-age=3600"}
+        )
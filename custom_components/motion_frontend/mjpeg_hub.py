@@ -0,0 +1,203 @@
+"""
+MJPEG stream multiplexer
+
+Every camera owns (lazily) an MjpegHub: the hub opens a single connection to
+the motion stream and dispatches every parsed frame to all the viewers
+currently subscribed. Frames are immutable bytes so they're shared (not copied)
+among the viewers. When the last viewer leaves, the upstream connection is kept
+around for a grace period so that page reloads or quick dashboard switches don't
+have to reconnect.
+"""
+
+import asyncio
+import typing
+
+from aiohttp import hdrs, web
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .helpers import LOGGER
+from .motionclient import TlsMode
+from .motionclient.mjpeg import MjpegStreamReader
+
+if typing.TYPE_CHECKING:
+    from .camera import MotionFrontendCamera
+
+
+STREAM_BOUNDARY = "motionfrontend"
+STREAM_CONTENT_TYPE = f"multipart/x-mixed-replace;boundary={STREAM_BOUNDARY}"
+STREAM_GRACE_PERIOD = 10  # seconds to keep upstream open after the last viewer left
+STREAM_CONNECT_TIMEOUT = 10
+
+
+class MjpegSubscriber:
+    """
+    A viewer slot: only the latest frame is held so a viewer never
+    retains more than one frame worth of memory
+    """
+
+    __slots__ = (
+        "frame",
+        "closed",
+        "dropped",
+        "_event",
+    )
+
+    def __init__(self):
+        self.frame: bytes | None = None
+        self.closed = False
+        self.dropped = 0  # frames the viewer skipped (overwritten or not sent)
+        self._event = asyncio.Event()
+
+    def push(self, frame: bytes) -> None:
+        if self.frame is not None:
+            self.dropped += 1  # latest frame wins
+        self.frame = frame
+        self._event.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._event.set()
+
+    async def async_get(self) -> bytes | None:
+        """wait for the next frame: None when the upstream is gone"""
+        await self._event.wait()
+        self._event.clear()
+        if self.closed:
+            return None
+        frame = self.frame
+        self.frame = None
+        return frame
+
+
+class MjpegHub:
+    __slots__ = (
+        "camera",
+        "_subscribers",
+        "_task",
+        "_grace_handle",
+    )
+
+    def __init__(self, camera: "MotionFrontendCamera"):
+        self.camera = camera
+        self._subscribers: set[MjpegSubscriber] = set()
+        self._task: asyncio.Task | None = None
+        self._grace_handle: asyncio.TimerHandle | None = None
+
+    @property
+    def viewers(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> MjpegSubscriber:
+        if self._grace_handle:
+            self._grace_handle.cancel()
+            self._grace_handle = None
+        if (self._task is None) or self._task.done():
+            # every run owns its viewers: a run being torn down (cancelled but
+            # not yet finished) only closes the ones it was serving
+            self._subscribers = set()
+            self._task = self.camera.hass.async_create_background_task(
+                self._async_run(self._subscribers),
+                f"{self.camera.entity_id} mjpeg upstream",
+            )
+        subscriber = MjpegSubscriber()
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: MjpegSubscriber) -> None:
+        self._subscribers.discard(subscriber)
+        if not self._subscribers and self._task and not self._grace_handle:
+            self._grace_handle = asyncio.get_running_loop().call_later(
+                STREAM_GRACE_PERIOD, self._grace_expired
+            )
+
+    async def async_close(self) -> None:
+        """drop the upstream connection (viewers, if any, get disconnected)"""
+        if self._grace_handle:
+            self._grace_handle.cancel()
+            self._grace_handle = None
+        if task := self._task:
+            self._task = None
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _grace_expired(self) -> None:
+        self._grace_handle = None
+        self.camera.hass.async_create_background_task(
+            self.async_close(), f"{self.camera.entity_id} mjpeg close"
+        )
+
+    async def async_handle_request(
+        self, request: web.Request, max_fps: float = 0
+    ) -> web.StreamResponse:
+        """
+        serve a viewer with the frames coming from the shared upstream.
+        Frames are sent at most max_fps (if set) and every write waits for
+        the viewer socket to drain: anything arriving in the meantime
+        replaces the pending frame so a slow client just gets the newest
+        one next (a lower frame rate instead of growing buffers and latency)
+        """
+        response = web.StreamResponse(headers={hdrs.CONTENT_TYPE: STREAM_CONTENT_TYPE})
+        min_interval = (1 / max_fps) if max_fps > 0 else 0
+        subscriber = self.subscribe()
+        try:
+            await response.prepare(request)
+            transport = request.transport
+            loop = asyncio.get_running_loop()
+            while (frame := await subscriber.async_get()) is not None:
+                if (transport is None) or transport.is_closing():
+                    break
+                next_time = loop.time() + min_interval
+                await response.write(
+                    b"--%s\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n"
+                    % (STREAM_BOUNDARY.encode(), len(frame))
+                )
+                await response.write(frame)
+                await response.write(b"\r\n")
+                if min_interval and ((delay := next_time - loop.time()) > 0):
+                    await asyncio.sleep(delay)
+        except ConnectionResetError:
+            pass  # viewer went away
+        finally:
+            self.unsubscribe(subscriber)
+            LOGGER.debug(
+                "Stream viewer for %s left (dropped frames: %d)",
+                self.camera.name,
+                subscriber.dropped,
+            )
+        return response
+
+    async def _async_run(self, subscribers: set[MjpegSubscriber]):
+        camera = self.camera
+        try:
+            websession = async_get_clientsession(
+                camera.hass, verify_ssl=(camera.client.tlsmode == TlsMode.STRICT)
+            )
+            async with asyncio.timeout(STREAM_CONNECT_TIMEOUT):
+                response = await camera.async_stream_request(
+                    camera.stream_url, session=websession
+                )
+            try:
+                response.raise_for_status()
+                reader = MjpegStreamReader(response)
+                while (frame := await reader.async_read_frame()) is not None:
+                    for subscriber in subscribers:
+                        subscriber.push(frame)
+            finally:
+                response.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exception:
+            LOGGER.warning("Error (%s) streaming from %s", str(exception), camera.name)
+        finally:
+            if self._task is asyncio.current_task():
+                # upstream failed on its own (not closed)
+                self._task = None
+                if self._grace_handle:
+                    self._grace_handle.cancel()
+                    self._grace_handle = None
+            for subscriber in subscribers:
+                subscriber.close()
+            subscribers.clear()
@@ -12,6 +12,8 @@ import aiohttp
 from yarl import URL
 
 from . import config_schema as cs
+from .auth import DigestAuth
+from .config_store import ConfigStore
 
 
 class MotionHttpClientError(Exception):
@@ -94,7 +96,7 @@ class MotionHttpClient:
         self._feature_advancedstream = False  # if True (from ver 4.2 on) allows more uri options and multiple streams on the same port
         self._feature_tls = False
         self._feature_globalactions = False  # if True (from ver 4.2 on) we can globally start/pause detection by issuing on threadid = 0
-        self._configs: dict[str, dict[str, cs.AnyParam]] = {}
+        self._configs: dict[str, ConfigStore] = {}
         self._cameras: dict[str, "MotionCamera"] = {}
         self._config_is_dirty = (
             False  # set when we modify a motion config param (async_config_set)
@@ -200,10 +202,12 @@ class MotionHttpClient:
         self._cameras.clear()
         self._configs.clear()
 
-        self._configs[cs.GLOBAL_ID] = await self.async_config_list(cs.GLOBAL_ID)
+        global_config = await self.async_config_list(cs.GLOBAL_ID)
+        self._configs[cs.GLOBAL_ID] = global_config
 
         async def add_camera(id: str):
-            self._configs[id] = await self.async_config_list(id)
+            # only the params differing from the global config get stored
+            self._configs[id] = await self.async_config_list(id, global_config)
             self._cameras[id] = self._camera_factory(self, id)
             return
 
@@ -275,27 +279,22 @@ class MotionHttpClient:
                 for _id in frozenset(self._config_need_restart):
                     await self.async_action_restart(_id)
 
-    async def async_config_list(self, id) -> dict[str, cs.AnyParam]:
-        config = {}
+    async def async_config_list(
+        self, id, parent: ConfigStore | None = None
+    ) -> ConfigStore:
         content, _ = await self.async_request(f"/{id}/config/list")
         if content:
             try:
                 if content.startswith("<!DOCTYPE html>"):
-                    config = dict(self._regex_pattern_config_html.findall(content))
+                    pattern = self._regex_pattern_config_html
                 else:
-                    config = dict(self._regex_pattern_config_text.findall(content))
-                for key, value in config.items():
-                    try:
-                        config[key] = cs.build_value(key, value)
-                    except Exception as e:
-                        self._logger.warning(str(e))
-                        config[key] = value
-
+                    pattern = self._regex_pattern_config_text
+                # typed params get built on access
+                return ConfigStore(dict(pattern.findall(content)), parent)
             except Exception as e:
                 self._logger.warning(str(e))
-                pass
 
-        return config
+        return ConfigStore(None, parent)
 
     async def async_config_set(
         self,
@@ -311,24 +310,50 @@ class MotionHttpClient:
 
         newvalue = cs.build_value(key, value)
         await self.async_request(f"/{id}/config/set?{key}={newvalue.__str__()}")
+        self._config_set_local(id, key, newvalue)
 
-        if (
-            id == cs.GLOBAL_ID
-        ):  # motion will set all threads with this same value when setting global conf
-            for config in self._configs.values():
-                if key in config:  # some params are only relevant to global conf
-                    config[key] = newvalue
-        else:
-            if config:
-                config[key] = newvalue
+        if persist:
+            await self.async_config_write()
 
-        self._config_is_dirty = True
-        if key in cs.RESTARTCONFIG_SET:
-            self._config_need_restart.add(id)
+    async def async_config_set_many(
+        self,
+        values: typing.Mapping[str, typing.Any],
+        force: bool = False,
+        persist: bool = False,
+        id: str = cs.GLOBAL_ID,
+    ):
+        """
+        set a batch of params in one go: motion webcontrol has no multi-set
+        (and handles its requests one at a time) so they're issued in sequence,
+        each successful one updating the local config, and the (optional)
+        write is done once at the end
+        """
+        config = self._configs.get(id)
+        newvalues = {
+            key: cs.build_value(key, value)
+            for key, value in values.items()
+            if force or not (config and (config.get(key) == value))
+        }
+        if not newvalues:
+            return
+
+        for key, newvalue in newvalues.items():
+            await self.async_request(f"/{id}/config/set?{key}={newvalue.__str__()}")
+            self._config_set_local(id, key, newvalue)
 
         if persist:
             await self.async_config_write()
 
+    def _config_set_local(self, id: str, key: str, newvalue: typing.Any):
+        # motion will set all threads with this same value when setting global conf:
+        # camera configs overlay the global one so this is a single write there
+        if (config := self._configs.get(id)) is not None:
+            config[key] = newvalue
+
+        self._config_is_dirty = True
+        if key in cs.RESTARTCONFIG_SET:
+            self._config_need_restart.add(id)
+
     async def async_config_write(self) -> None:
         """
         Motion saves all of the configs in 1 call: no option to differentiate atm
@@ -512,6 +537,8 @@ class MotionCamera:
         self._id = id
         self._connected = False  # netcam connected in 'motion' terms
         self._paused = False  # detection paused in 'motion' terms
+        self._stream_auth: aiohttp.BasicAuth | DigestAuth | None = None
+        self._stream_auth_key: tuple | None = None
 
     @property
     def client(self):
@@ -610,6 +637,44 @@ class MotionCamera:
             )
         return str(stream_authentication).split(":")
 
+    @property
+    def stream_auth(self) -> aiohttp.BasicAuth | DigestAuth | None:
+        """
+        the authenticator for the stream/image endpoints according to
+        stream_auth_method. The instance is cached so that digest auth
+        can reuse the server nonce across requests
+        """
+        stream_auth_method = self.config.get(cs.STREAM_AUTH_METHOD)
+        if stream_auth_method == cs.AUTH_MODE_BASIC:
+            auth_class = aiohttp.BasicAuth
+        elif stream_auth_method == cs.AUTH_MODE_DIGEST:
+            auth_class = DigestAuth
+        else:
+            self._stream_auth = self._stream_auth_key = None
+            return None
+
+        stream_authentication = self.stream_authentication
+        auth_key = (auth_class, stream_authentication[0], stream_authentication[-1])
+        if self._stream_auth_key != auth_key:
+            self._stream_auth_key = auth_key
+            self._stream_auth = auth_class(
+                stream_authentication[0], stream_authentication[-1]
+            )
+        return self._stream_auth
+
+    async def async_stream_request(
+        self, url: str, session: aiohttp.ClientSession | None = None, **kwargs
+    ) -> aiohttp.ClientResponse:
+        """
+        GET url (either stream_url or image_url) authenticating as needed.
+        The response is returned 'open' so the caller can stream the content
+        """
+        session = session or self._client._session
+        auth = self.stream_auth
+        if isinstance(auth, DigestAuth):
+            return await auth.async_request(session, "GET", url, **kwargs)
+        return await session.get(url, auth=auth, **kwargs)
+
     async def async_config_set(
         self, key: str, value: typing.Any, force: bool = False, persist: bool = False
     ):
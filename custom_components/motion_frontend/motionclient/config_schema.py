@@ -2,7 +2,7 @@
 Motion daemon config parameters definitions
 """
 
-from collections import ChainMap
+from functools import lru_cache
 import typing
 
 import voluptuous as vol
@@ -207,6 +207,10 @@ def DESCRIPTOR_UPPERSTRING_ENUM(_set: typing.Container) -> Descriptor:
     return Descriptor(UpperStringParam, _set=_set)
 
 
+BUILD_CACHE_SIZE = 2048  # distinct (key, value) pairs across all the configs
+_BUILD_CACHE_TYPES = (str, int, bool)  # exact types only (hashable and immutable)
+
+
 def build_value(key: str, value: typing.Any):
     """
     Polimorfic factory for typed params:
@@ -214,8 +218,15 @@ def build_value(key: str, value: typing.Any):
     accordingly.
     return None (untyped then) if value represent a None
     Fallback to plain 'str' if anything goes wrong
+    Typed params are never modified so the same (key, value) always returns
+    the same (cached) instance
     """
+    if value.__class__ in _BUILD_CACHE_TYPES:
+        return _build_value_cached(key, value)
+    return _build_value(key, value)
+
 
+def _build_value(key: str, value: typing.Any):
     if value in NULL_SET:
         return None
 
@@ -233,6 +244,10 @@ def build_value(key: str, value: typing.Any):
     return Param(value, DESCRIPTOR_STR)
 
 
+# typed so that True, 1 and "1" don't share their result
+_build_value_cached = lru_cache(maxsize=BUILD_CACHE_SIZE, typed=True)(_build_value)
+
+
 #
 # List (almost exhaustive) of motion params and corresponding descriptors
 #
@@ -677,19 +692,9 @@ RESTARTCONFIG_SET = {
     MMALCAM_CONTROL_PARAMS,
 }
 
-SCHEMA: typing.MutableMapping[str, Descriptor] = ChainMap(
-    SECTION_SYSTEM_MAP,
-    SECTION_V4L2_MAP,
-    SECTION_NETCAM_MAP,
-    SECTION_MMALCAM_MAP,
-    SECTION_WEBCONTROL_MAP,
-    SECTION_STREAM_MAP,
-    SECTION_IMAGE_MAP,
-    SECTION_MOTION_MAP,
-    SECTION_SCRIPT_MAP,
-    SECTION_PICTURE_MAP,
-    SECTION_MOVIE_MAP,
-    SECTION_TIMELAPSE_MAP,
-    SECTION_DATABASE_MAP,
-    SECTION_TRACK_MAP,
-)
+# flat lookup table for all of the sections (the first section
+# defining a key wins as in the ChainMap this used to be)
+SCHEMA: dict[str, Descriptor] = {}
+for _section_map in reversed(SECTION_SET_MAP.values()):
+    SCHEMA.update(_section_map)
+del _section_map
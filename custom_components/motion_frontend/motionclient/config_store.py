@@ -0,0 +1,158 @@
+"""
+Compact storage for motion config params
+
+A config (global or camera) carries a few hundred params and most of them
+repeat the same values across cameras. Instead of building a typed param
+(a str/int subclass instance with its own __dict__) for every one of them we
+keep the raw strings, interned so that equal values (and all the keys) are
+shared among every config, and build the typed params (see build_value) only
+when they're actually accessed. The descriptors stay in the per-key SCHEMA
+table (the typed params just reference them).
+
+Camera configs are overlays on the global one: they only store the params
+which differ from it (camera only params in CAMERACONFIG_SET are always
+local and never inherited while global only params in GLOBALCONFIG_SET are
+always read from the global config). Setting a global param is then a single
+write which every camera sees: motion applies it to all of the threads so
+the (few) camera overrides of that key just get dropped.
+"""
+
+from sys import intern
+import typing
+
+from . import config_schema as cs
+
+_MISSING = object()
+
+
+class ConfigStore(typing.MutableMapping[str, cs.AnyParam]):
+    __slots__ = (
+        "parent",
+        "_raw",
+        "_typed",
+        "_overrides",
+    )
+
+    def __init__(
+        self,
+        raw: typing.Mapping[str, str] | None = None,
+        parent: "ConfigStore | None" = None,
+    ):
+        self.parent = parent
+        # key -> raw value (None for params set to None)
+        self._raw: dict[str, str | None] = {}
+        # key -> typed param (lazily built on access)
+        self._typed: dict[str, cs.AnyParam] = {}
+        # (global config only) key -> the camera configs overriding it
+        self._overrides: dict[str, list[ConfigStore]] = {}
+        if raw:
+            for key, value in raw.items():
+                self._set_raw(intern(key), intern(str(value)))
+
+    def __getitem__(self, key: str) -> cs.AnyParam:
+        try:
+            return self._typed[key]
+        except KeyError:
+            pass
+        value = self._raw.get(key, _MISSING)
+        if value is _MISSING:
+            if self._inherits(key):
+                return self.parent[key]  # type: ignore
+            raise KeyError(key)
+        if value is None:
+            param = None
+        else:
+            try:
+                param = cs.build_value(key, value)
+            except Exception:
+                param = cs.Param(value, cs.DESCRIPTOR_STR)  # type: ignore
+        self._typed[key] = param
+        return param
+
+    def __setitem__(self, key: str, value: typing.Any) -> None:
+        if value is None:
+            raw = None
+        else:
+            raw = intern(str(value))
+        if not self._set_raw(intern(key), raw):
+            return
+        if isinstance(value, (cs.Param, cs.IntParam)) or (value is None):
+            self._typed[key] = value
+        else:
+            self._typed.pop(key, None)
+        # the value now applies to every camera
+        for child in self._overrides.pop(key, ()):
+            child._raw.pop(key, None)
+            child._typed.pop(key, None)
+
+    def __delitem__(self, key: str) -> None:
+        del self._raw[key]
+        self._typed.pop(key, None)
+        if self.parent:
+            self.parent._remove_override(key, self)
+
+    def __contains__(self, key: object) -> bool:
+        return (key in self._raw) or (
+            self._inherits(key) and (key in self.parent)  # type: ignore
+        )
+
+    def __iter__(self) -> typing.Iterator[str]:
+        yield from self._raw
+        if parent := self.parent:
+            for key in parent:
+                if (key not in self._raw) and self._inherits(key):
+                    yield key
+
+    def __len__(self) -> int:
+        if self.parent is None:
+            return len(self._raw)
+        return sum(1 for _ in self)
+
+    @property
+    def overrides(self) -> int:
+        """number of params stored here (i.e. not inherited)"""
+        return len(self._raw)
+
+    def raw(self, key: str) -> str | None:
+        """the raw value (no typed param built)"""
+        value = self._raw.get(key, _MISSING)
+        if value is _MISSING:
+            if self._inherits(key):
+                return self.parent.raw(key)  # type: ignore
+            return None
+        return value  # type: ignore
+
+    def descriptor(self, key: str) -> cs.Descriptor:
+        """the (schema) descriptor for key"""
+        if descriptor := cs.SCHEMA.get(key):
+            return descriptor
+        param = self.get(key)
+        return cs.DESCRIPTOR_STR if param is None else param.descriptor
+
+    def _inherits(self, key: object) -> bool:
+        return (self.parent is not None) and (key not in cs.CAMERACONFIG_SET)
+
+    def _set_raw(self, key: str, value: str | None) -> bool:
+        """store value unless inherited as it is. Returns False if not stored"""
+        if parent := self.parent:
+            if key in cs.GLOBALCONFIG_SET:
+                return False  # always from the global config
+            if key not in cs.CAMERACONFIG_SET:
+                if parent._raw.get(key, _MISSING) == value:
+                    # same as global: drop any override
+                    if key in self._raw:
+                        del self[key]
+                    return False
+                if key not in self._raw:
+                    parent._overrides.setdefault(key, []).append(self)
+        self._raw[key] = value
+        return True
+
+    def _remove_override(self, key: str, child: "ConfigStore") -> None:
+        if children := self._overrides.get(key):
+            try:
+                children.remove(child)
+            except ValueError:
+                pass
+            if not children:
+                del self._overrides[key]
@@ -0,0 +1,152 @@
+"""
+MJPEG (multipart/x-mixed-replace) stream parsing
+
+motion sends every frame as a multipart part carrying its own Content-Length
+so the fast path just reads the part headers and then the exact payload.
+When the server doesn't cooperate (no boundary/Content-Length) we fall back
+to scanning the raw bytes for the jpeg SOI/EOI markers.
+"""
+
+import asyncio
+import re
+
+import aiohttp
+
+SOI = b"\xff\xd8"  # jpeg 'start of image' marker
+EOI = b"\xff\xd9"  # jpeg 'end of image' marker
+
+MAX_HEADER_LINES = 32  # guard against garbage while looking for part headers
+
+_regex_boundary = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+
+
+class JpegScanner:
+    """
+    Incremental SOI/EOI scanner: data is accumulated in a bytearray and
+    searches restart from where the previous one stopped so that every byte
+    is scanned (almost) once regardless of how the stream gets chunked
+    """
+
+    __slots__ = (
+        "buffer",
+        "_start",
+        "_offset",
+    )
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self._start = -1  # position of SOI in buffer (-1 if not found yet)
+        self._offset = 0  # position to resume the search from
+
+    def feed(self, chunk: bytes) -> None:
+        self.buffer += chunk
+
+    def next_frame(self) -> bytes | None:
+        """return the next complete jpeg in buffer (if any)"""
+        buffer = self.buffer
+        if self._start < 0:
+            start = buffer.find(SOI, self._offset)
+            if start < 0:
+                # discard everything but the last byte since it could
+                # be the first half of a marker split across chunks
+                del buffer[: max(len(buffer) - 1, 0)]
+                self._offset = 0
+                return None
+            # drop anything preceding SOI (including stray EOI markers)
+            del buffer[:start]
+            self._start = 0
+            self._offset = 2
+
+        end = buffer.find(EOI, self._offset)
+        if end < 0:
+            self._offset = max(len(buffer) - 1, 2)
+            return None
+
+        end += 2
+        with memoryview(buffer) as view:
+            frame = bytes(view[:end])
+        del buffer[:end]
+        self._start = -1
+        self._offset = 0
+        return frame
+
+
+class MjpegStreamReader:
+    """
+    Extracts jpeg frames from an (open) aiohttp response to an MJPEG stream
+    """
+
+    __slots__ = (
+        "_content",
+        "_boundary",
+        "_scanner",
+    )
+
+    def __init__(self, response: aiohttp.ClientResponse):
+        self._content = response.content
+        match = _regex_boundary.search(
+            response.headers.get(aiohttp.hdrs.CONTENT_TYPE, "")
+        )
+        # some servers declare the boundary including the leading '--'
+        self._boundary = match.group(1).strip().lstrip("-").encode() if match else None
+        self._scanner: JpegScanner | None = None if self._boundary else JpegScanner()
+
+    async def async_read_frame(self) -> bytes | None:
+        """return the next frame or None when the stream ends"""
+        if self._scanner is None:
+            try:
+                return await self._async_read_part()
+            except ValueError:
+                # line too long or malformed header: this is not what we expected
+                self._scanner = JpegScanner()
+        return await self._async_scan_frame()
+
+    async def _async_read_part(self) -> bytes | None:
+        content = self._content
+        boundary = self._boundary
+        while True:
+            line = await content.readline()
+            if not line:
+                return None
+            if line.strip().lstrip(b"-") == boundary:
+                break
+
+        length = None
+        for _ in range(MAX_HEADER_LINES):
+            line = await content.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                break
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                length = int(value)
+        else:
+            raise ValueError("Invalid multipart headers")
+
+        if length is None:
+            # no way to know the part size: from now on just look for
+            # jpeg markers since the scanner could read past the part
+            self._scanner = JpegScanner()
+            return await self._async_scan_frame()
+
+        try:
+            return await content.readexactly(length)
+        except asyncio.IncompleteReadError:
+            return None  # stream interrupted in the middle of a frame
+
+    async def _async_scan_frame(self) -> bytes | None:
+        scanner: JpegScanner = self._scanner  # type: ignore
+        content = self._content
+        while (frame := scanner.next_frame()) is None:
+            chunk = await content.readany()
+            if not chunk:
+                return None
+            scanner.feed(chunk)
+        return frame
+
+
+async def async_read_frame(response: aiohttp.ClientResponse) -> bytes | None:
+    """extract a single jpeg from an MJPEG stream response"""
+    return await MjpegStreamReader(response).async_read_frame()
@@ -0,0 +1,510 @@
+"""
+SQLite catalog of the recordings
+
+Movie and picture events coming from motion (webhook) are stored here, one row
+per recording file, so that queries by camera and time range don't need to
+walk target_dir. The database is owned by a dedicated thread: events are
+queued from the event loop and written in batches (one transaction every
+BATCH_DELAY seconds or BATCH_SIZE events). Queries go through the same
+queue so they always see the events received before them.
+Files we never got an event for (recorded while HA was down, before the
+catalog existed or with no hooks installed) are caught up by reconciling
+the catalog with a target_dir scan (see scan_recordings): they're added as
+single file events when they can be attributed to a camera (by its own
+target_dir or when there's only one camera) while rows of files gone are
+dropped.
+"""
+
+import asyncio
+from datetime import timedelta
+import mimetypes
+import os
+import queue
+import sqlite3
+import threading
+from time import monotonic, time
+import typing
+
+from .const import ON_EVENT_START, ON_MOVIE_END, ON_MOVIE_START, ON_PICTURE_SAVE
+from .helpers import LOGGER
+
+BATCH_DELAY = 1.0
+BATCH_SIZE = 100
+# target_dir rescan period when no hooks are installed (no events at all)
+RECONCILE_INTERVAL = timedelta(hours=1)
+
+CATALOG_EVENTS = (ON_EVENT_START, ON_MOVIE_START, ON_MOVIE_END, ON_PICTURE_SAVE)
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS recordings (
+        id INTEGER PRIMARY KEY,
+        camera TEXT NOT NULL,
+        event_id TEXT,
+        event_start REAL NOT NULL,
+        start_time REAL NOT NULL,
+        end_time REAL,
+        path TEXT NOT NULL UNIQUE,
+        size INTEGER,
+        type INTEGER
+    )""",
+    "CREATE INDEX IF NOT EXISTS recordings_camera ON recordings(camera, start_time)",
+    "CREATE INDEX IF NOT EXISTS recordings_start ON recordings(start_time)",
+    "CREATE INDEX IF NOT EXISTS recordings_event ON recordings(camera, event_start)",
+)
+
+_SQL_START = (
+    "INSERT INTO recordings"
+    " (camera, event_id, event_start, start_time, path, type)"
+    " VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(path) DO NOTHING"
+)
+_SQL_END = (
+    "INSERT INTO recordings"
+    " (camera, event_id, event_start, start_time, end_time, path, size, type)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(path) DO UPDATE"
+    " SET end_time=excluded.end_time, size=excluded.size"
+)
+_SQL_SCANNED = (
+    "INSERT INTO recordings"
+    " (camera, event_start, start_time, end_time, path, size)"
+    " VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(path) DO NOTHING"
+)
+
+# path -> (camera or None if not attributable, size, mtime)
+ScannedFiles = dict[str, tuple[str | None, int, float]]
+
+
+class Recording(typing.NamedTuple):
+    camera: str
+    event_id: str | None
+    event_start: float
+    start_time: float
+    end_time: float | None
+    path: str
+    size: int | None
+    type: int | None
+
+
+class RecordingCatalog:
+    __slots__ = (
+        "path",
+        "usage",
+        "_queue",
+        "_thread",
+        "_event_starts",
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        # camera -> bytes used by its recordings (maintained by the catalog thread)
+        self.usage: dict[str, int] = {}
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        # camera -> (event_id, time) of the last on_event_start
+        self._event_starts: dict[str, tuple[str | None, float]] = {}
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="motion_frontend catalog", daemon=True
+        )
+        self._thread.start()
+
+    async def async_close(self) -> None:
+        if thread := self._thread:
+            self._thread = None
+            self._queue.put(None)
+            await asyncio.get_running_loop().run_in_executor(None, thread.join)
+
+    def add_event(
+        self,
+        event: str,
+        camera: str,
+        event_id: str | None,
+        filename: str | None,
+        filetype: str | None,
+    ) -> None:
+        """queue a motion event (non blocking, called from the event loop)"""
+        now = time()
+        if event == ON_EVENT_START:
+            self._event_starts[camera] = (event_id, now)
+            return
+        if not filename or (self._thread is None):
+            return
+        try:
+            _filetype = int(filetype) if filetype else None
+        except ValueError:
+            _filetype = None
+        last_event_id, event_start = self._event_starts.get(camera, (None, now))
+        if last_event_id != event_id:
+            event_start = now  # we missed the start
+        self._queue.put(
+            (event, camera, event_id, event_start, now, filename, _filetype)
+        )
+
+    async def async_execute(
+        self, func: typing.Callable[[sqlite3.Connection], typing.Any]
+    ) -> typing.Any:
+        """run func(connection) on the catalog thread"""
+        if self._thread is None:
+            raise RuntimeError("Recordings catalog is closed")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((func, loop, future))
+        return await future
+
+    async def async_recordings(
+        self,
+        camera: str | None = None,
+        start_time: float | None = None,
+        end_time: float | None = None,
+    ) -> list[Recording]:
+        """recordings (ordered by time) of camera (or all) started in [start_time, end_time)"""
+        query = (
+            "SELECT camera, event_id, event_start, start_time, end_time, path, size, type"
+            " FROM recordings"
+        )
+        clauses = []
+        params = []
+        if camera is not None:
+            clauses.append("camera=?")
+            params.append(camera)
+        if start_time is not None:
+            clauses.append("start_time>=?")
+            params.append(start_time)
+        if end_time is not None:
+            clauses.append("start_time<?")
+            params.append(end_time)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY start_time"
+
+        def _query(connection: sqlite3.Connection):
+            return [Recording(*row) for row in connection.execute(query, params)]
+
+        return await self.async_execute(_query)
+
+    async def _async_fetch(self, query: str, params: tuple = ()) -> list[tuple]:
+        return await self.async_execute(
+            lambda connection: connection.execute(query, params).fetchall()
+        )
+
+    async def async_cameras(self) -> list[str]:
+        return [
+            row[0]
+            for row in await self._async_fetch(
+                "SELECT DISTINCT camera FROM recordings ORDER BY camera"
+            )
+        ]
+
+    async def async_start_times(
+        self, camera: str | None = None, resolution: int = 900
+    ) -> list[float]:
+        """
+        recordings start_time(s) floored to resolution seconds (most recent first):
+        enough to tell the (local) days having recordings without fetching them all
+        """
+        query = "SELECT DISTINCT CAST(start_time / ? AS INTEGER) * ? AS slot FROM recordings"
+        params: tuple = (resolution, resolution)
+        if camera is not None:
+            query += " WHERE camera=?"
+            params += (camera,)
+        return [
+            row[0]
+            for row in await self._async_fetch(query + " ORDER BY slot DESC", params)
+        ]
+
+    async def async_day_cameras(self, start_time: float, end_time: float) -> list[str]:
+        return [
+            row[0]
+            for row in await self._async_fetch(
+                "SELECT DISTINCT camera FROM recordings"
+                " WHERE start_time>=? AND start_time<? ORDER BY camera",
+                (start_time, end_time),
+            )
+        ]
+
+    async def async_events(
+        self, camera: str, start_time: float, end_time: float
+    ) -> list[tuple[float, str | None, int, str]]:
+        """(event_start, event_id, number of files, first file) for the events in the range"""
+        return await self._async_fetch(
+            "SELECT event_start, event_id, COUNT(*), MIN(path) FROM recordings"
+            " WHERE camera=? AND start_time>=? AND start_time<?"
+            " GROUP BY event_start ORDER BY event_start",
+            (camera, start_time, end_time),
+        )
+
+    async def async_event_recordings(
+        self, camera: str, event_start: float
+    ) -> list[Recording]:
+        return [
+            Recording(*row)
+            for row in await self._async_fetch(
+                "SELECT camera, event_id, event_start, start_time, end_time, path, size, type"
+                " FROM recordings WHERE camera=? AND event_start=? ORDER BY start_time",
+                (camera, event_start),
+            )
+        ]
+
+    async def async_event_paths(self, path: str) -> list[str]:
+        """all the files (ordered by time) of the event path belongs to"""
+        return [
+            row[0]
+            for row in await self._async_fetch(
+                "SELECT r.path FROM recordings AS r JOIN recordings AS e"
+                " ON r.camera=e.camera AND r.event_start=e.event_start"
+                " WHERE e.path=? ORDER BY r.start_time",
+                (path,),
+            )
+        ]
+
+    async def async_event_files(
+        self, camera: str, before: float, limit: int
+    ) -> list[tuple[float, list[tuple[str, int]]]]:
+        """the oldest (at most limit) events started before 'before' with their (path, size)"""
+
+        def _query(connection: sqlite3.Connection):
+            event_starts = [
+                row[0]
+                for row in connection.execute(
+                    "SELECT DISTINCT event_start FROM recordings"
+                    " WHERE camera=? AND event_start<? ORDER BY event_start LIMIT ?",
+                    (camera, before, limit),
+                )
+            ]
+            if not event_starts:
+                return []
+            events: dict[float, list[tuple[str, int]]] = {
+                event_start: [] for event_start in event_starts
+            }
+            for event_start, path, size in connection.execute(
+                "SELECT event_start, path, size FROM recordings"
+                " WHERE camera=? AND event_start>=? AND event_start<=?",
+                (camera, event_starts[0], event_starts[-1]),
+            ):
+                events[event_start].append((path, size or 0))
+            return list(events.items())
+
+        return await self.async_execute(_query)
+
+    async def async_delete_events(self, camera: str, event_starts: list[float]) -> None:
+        def _delete(connection: sqlite3.Connection):
+            params = [(camera, event_start) for event_start in event_starts]
+            with connection:
+                size = 0
+                for _params in params:
+                    size += connection.execute(
+                        "SELECT TOTAL(size) FROM recordings"
+                        " WHERE camera=? AND event_start=?",
+                        _params,
+                    ).fetchone()[0]
+                connection.executemany(
+                    "DELETE FROM recordings WHERE camera=? AND event_start=?", params
+                )
+            self.usage[camera] = max(self.usage.get(camera, 0) - int(size), 0)
+
+        await self.async_execute(_delete)
+
+    async def async_reconcile(
+        self, root: str, files: ScannedFiles, scan_time: float
+    ) -> tuple[int, int]:
+        """
+        sync the rows under root with the files found there by a scan started at
+        scan_time. Returns the number of (recordings) added and removed
+        """
+
+        def _reconcile(connection: sqlite3.Connection):
+            prefix = root.rstrip("/") + "/"
+            with connection:
+                # rows newer than the scan could be files it didn't see yet
+                gone = [
+                    row
+                    for row in connection.execute(
+                        "SELECT path FROM recordings"
+                        " WHERE substr(path, 1, ?)=? AND start_time<?",
+                        (len(prefix), prefix, scan_time),
+                    )
+                    if row[0] not in files
+                ]
+                connection.executemany("DELETE FROM recordings WHERE path=?", gone)
+                changes = connection.total_changes
+                connection.executemany(
+                    _SQL_SCANNED,
+                    (
+                        (camera, mtime, mtime, mtime, path, size)
+                        for path, (camera, size, mtime) in files.items()
+                        if camera is not None
+                    ),
+                )
+                added = connection.total_changes - changes
+            self.usage = _query_usage(connection)
+            return added, len(gone)
+
+        return await self.async_execute(_reconcile)
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with connection:
+            for statement in _SCHEMA:
+                connection.execute(statement)
+        # from now on the usage is updated incrementally
+        self.usage = _query_usage(connection)
+        return connection
+
+    def _write(self, connection: sqlite3.Connection, events: list[tuple]) -> None:
+        usage_delta: dict[str, int] = {}
+        try:
+            with connection:
+                for (
+                    event,
+                    camera,
+                    event_id,
+                    event_start,
+                    now,
+                    filename,
+                    filetype,
+                ) in events:
+                    if event == ON_MOVIE_START:
+                        connection.execute(
+                            _SQL_START,
+                            (camera, event_id, event_start, now, filename, filetype),
+                        )
+                        continue
+                    try:
+                        size = os.stat(filename).st_size
+                    except OSError:
+                        size = None  # not local (or gone)
+                    previous = connection.execute(
+                        "SELECT size FROM recordings WHERE path=?", (filename,)
+                    ).fetchone()
+                    usage_delta[camera] = (
+                        usage_delta.get(camera, 0)
+                        + (size or 0)
+                        - ((previous and previous[0]) or 0)
+                    )
+                    connection.execute(
+                        _SQL_END,
+                        (
+                            camera,
+                            event_id,
+                            event_start,
+                            now,
+                            now,
+                            filename,
+                            size,
+                            filetype,
+                        ),
+                    )
+        except sqlite3.Error as exception:
+            LOGGER.warning("Error (%s) writing recordings catalog", str(exception))
+        else:
+            usage = self.usage
+            for camera, delta in usage_delta.items():
+                usage[camera] = usage.get(camera, 0) + delta
+        events.clear()
+
+    def _run(self) -> None:
+        try:
+            connection = self._connect()
+        except Exception as exception:
+            LOGGER.error("Error (%s) opening recordings catalog", str(exception))
+            # keep serving the queue (failing queries) so that nobody hangs
+            while (item := self._queue.get()) is not None:
+                if len(item) == 3:
+                    _, loop, future = item
+                    loop.call_soon_threadsafe(_set_exception, future, exception)
+            return
+        _queue = self._queue
+        pending: list[tuple] = []
+        deadline = 0.0
+        while True:
+            try:
+                if pending:
+                    item = _queue.get(timeout=max(deadline - monotonic(), 0))
+                else:
+                    item = _queue.get()
+            except queue.Empty:
+                self._write(connection, pending)
+                continue
+
+            if item is None:
+                break
+            if len(item) == 3:
+                # a query: flush so that it sees everything received so far
+                if pending:
+                    self._write(connection, pending)
+                func, loop, future = item
+                try:
+                    result = func(connection)
+                except Exception as exception:
+                    loop.call_soon_threadsafe(_set_exception, future, exception)
+                else:
+                    loop.call_soon_threadsafe(_set_result, future, result)
+                continue
+
+            if not pending:
+                deadline = monotonic() + BATCH_DELAY
+            pending.append(item)
+            if len(pending) >= BATCH_SIZE:
+                self._write(connection, pending)
+
+        if pending:
+            self._write(connection, pending)
+        connection.close()
+
+
+def scan_recordings(
+    target_dir: str, camera_dirs: dict[str, str | None]
+) -> tuple[ScannedFiles, int]:
+    """
+    walk target_dir (blocking) collecting the media files. camera_dirs maps
+    the target_dir of every camera to its id (None when shared by more cameras)
+    so that the files there are attributed to it.
+    Returns the files and how many of them couldn't be attributed
+    """
+    prefixes = sorted(
+        ((path.rstrip("/") + "/", camera) for path, camera in camera_dirs.items()),
+        reverse=True,  # longest (most specific) first
+    )
+    files: ScannedFiles = {}
+    unattributed = 0
+    for dirpath, _, filenames in os.walk(target_dir):
+        dirprefix = dirpath.rstrip("/") + "/"
+        camera = next(
+            (camera for prefix, camera in prefixes if dirprefix.startswith(prefix)),
+            None,
+        )
+        for filename in filenames:
+            mime_type, _ = mimetypes.guess_type(filename)
+            if not mime_type or not mime_type.startswith(("image/", "video/")):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files[path] = (camera, stat.st_size, stat.st_mtime)
+            if camera is None:
+                unattributed += 1
+    return files, unattributed
+
+
+def _query_usage(connection: sqlite3.Connection) -> dict[str, int]:
+    return {
+        camera: int(size)
+        for camera, size in connection.execute(
+            "SELECT camera, TOTAL(size) FROM recordings GROUP BY camera"
+        )
+    }
+
+
+def _set_result(future: asyncio.Future, result) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, exception: Exception) -> None:
+    if not future.done():
+        future.set_exception(exception)
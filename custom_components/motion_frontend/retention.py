@@ -0,0 +1,159 @@
+"""
+Recordings retention
+
+motion never deletes anything so we enforce (per camera) an age limit and a
+size quota on the recordings in target_dir. Disk usage is tracked
+incrementally by the recordings catalog so checking the quotas costs nothing
+(only the recordings in the catalog are managed: files which can't be
+attributed to a camera by the target_dir scan are left alone);
+when over limits, whole events (all of their files) are deleted oldest first
+in small batches spaced in time so that the disk isn't hammered.
+"""
+
+import asyncio
+from datetime import timedelta
+import os
+from time import time
+import typing
+
+from homeassistant.helpers.event import async_track_time_interval
+
+from .helpers import LOGGER
+
+if typing.TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+    from .recording_catalog import RecordingCatalog
+
+
+CHECK_INTERVAL = timedelta(minutes=10)
+BATCH_EVENTS = 20  # events deleted in a single batch
+BATCH_DELAY = 5  # seconds between batches
+MIN_EVENT_AGE = 600  # seconds: newer events could still be recording
+
+
+class RetentionManager:
+    __slots__ = (
+        "hass",
+        "catalog",
+        "target_dir",
+        "max_age",
+        "max_size",
+        "cameras",
+        "_unsub",
+        "_task",
+    )
+
+    def __init__(
+        self,
+        hass: "HomeAssistant",
+        catalog: "RecordingCatalog",
+        target_dir: str,
+        max_age: float,
+        max_size: int,
+        cameras: list[str] | None,
+    ):
+        self.hass = hass
+        self.catalog = catalog
+        self.target_dir = target_dir.rstrip("/")
+        self.max_age = max_age  # seconds (0: no limit)
+        self.max_size = max_size  # bytes for each camera (0: no limit)
+        self.cameras = cameras  # cameras under retention (None: all)
+        self._unsub = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._unsub = async_track_time_interval(
+            self.hass, self._schedule, CHECK_INTERVAL
+        )
+        self._schedule()
+
+    def close(self) -> None:
+        if self._unsub:
+            self._unsub()
+            self._unsub = None
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _schedule(self, *_) -> None:
+        if self._task is None:
+            self._task = self.hass.async_create_background_task(
+                self._async_run(), "motion_frontend retention"
+            )
+
+    async def _async_run(self):
+        try:
+            for camera in self.cameras or await self.catalog.async_cameras():
+                await self._async_cleanup(camera)
+        except asyncio.CancelledError:
+            raise
+        except RuntimeError:
+            pass  # catalog closed
+        except Exception as exception:
+            LOGGER.warning("Error (%s) cleaning up recordings", str(exception))
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+
+    async def _async_cleanup(self, camera: str):
+        catalog = self.catalog
+        newest = time() - MIN_EVENT_AGE
+
+        if self.max_age:
+            before = min(newest, time() - self.max_age)
+            while events := await catalog.async_event_files(
+                camera, before, BATCH_EVENTS
+            ):
+                await self._async_delete(camera, events)
+                if len(events) < BATCH_EVENTS:
+                    break
+                await asyncio.sleep(BATCH_DELAY)
+
+        if self.max_size:
+            while (excess := catalog.usage.get(camera, 0) - self.max_size) > 0:
+                events = await catalog.async_event_files(camera, newest, BATCH_EVENTS)
+                # just enough of the oldest to get back under quota
+                selected = []
+                for event in events:
+                    selected.append(event)
+                    excess -= sum(size for _, size in event[1])
+                    if excess <= 0:
+                        break
+                if not selected:
+                    break
+                await self._async_delete(camera, selected)
+                if excess > 0:
+                    await asyncio.sleep(BATCH_DELAY)
+
+    async def _async_delete(
+        self, camera: str, events: list[tuple[float, list[tuple[str, int]]]]
+    ):
+        await self.hass.async_add_executor_job(
+            self._delete_files, [path for _, files in events for path, _ in files]
+        )
+        await self.catalog.async_delete_events(
+            camera, [event_start for event_start, _ in events]
+        )
+        LOGGER.debug("Retention removed %d events of camera %s", len(events), camera)
+
+    def _delete_files(self, paths: list[str]) -> None:
+        prefix = self.target_dir + "/"
+        dirs = set()
+        for path in paths:
+            if not path.startswith(prefix):
+                continue  # never touch anything outside target_dir
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as exception:
+                LOGGER.warning("Error (%s) removing %s", str(exception), path)
+            dirs.add(os.path.dirname(path))
+        # cleanup (now) empty directories
+        for dirname in sorted(dirs, reverse=True):
+            if dirname.startswith(prefix):
+                try:
+                    os.rmdir(dirname)
+                except OSError:
+                    pass
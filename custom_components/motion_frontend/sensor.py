@@ -0,0 +1,67 @@
+"""Recordings disk usage sensors."""
+
+import typing
+
+from homeassistant.components import sensor
+from homeassistant.const import UnitOfInformation
+
+from .const import DOMAIN
+
+if typing.TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+    from homeassistant.helpers.device_registry import DeviceInfo
+
+    from . import MotionFrontendApi
+    from .camera import MotionFrontendCamera
+
+
+async def async_setup_entry(
+    hass: "HomeAssistant", config_entry: "ConfigEntry", async_add_entities
+):
+    api: "MotionFrontendApi" = hass.data[DOMAIN][config_entry.entry_id]
+    if api.catalog:
+        async_add_entities(
+            MotionFrontendRecordingsSensor(api, camera)
+            for camera in api.cameras.values()
+        )
+
+
+class MotionFrontendRecordingsSensor(sensor.SensorEntity):
+    # HA core entity attributes:
+    _attr_device_class = sensor.SensorDeviceClass.DATA_SIZE
+    _attr_icon = "mdi:harddisk"
+    _attr_native_unit_of_measurement = UnitOfInformation.MEBIBYTES
+    _attr_should_poll = True
+    _attr_state_class = sensor.SensorStateClass.MEASUREMENT
+    _attr_suggested_display_precision = 1
+
+    device_info: "DeviceInfo"
+    name: str
+    unique_id: str
+
+    __slots__ = (
+        "device_info",
+        "name",
+        "unique_id",
+        "_api",
+        "_camera_id",
+    )
+
+    def __init__(self, api: "MotionFrontendApi", camera: "MotionFrontendCamera"):
+        self._api = api
+        self._camera_id = camera.id
+        self.device_info = api.device_info
+        self.name = f"{camera.name} recordings"
+        self.unique_id = f"{camera.unique_id}_recordings"
+
+    @property
+    def available(self) -> bool:
+        return self._api.catalog is not None
+
+    @property
+    def native_value(self) -> float | None:
+        if catalog := self._api.catalog:
+            # maintained incrementally by the catalog: no I/O here
+            return catalog.usage.get(self._camera_id, 0) / 1048576
+        return None
@@ -0,0 +1,85 @@
+"""
+Motion events over UDP
+
+A lighter alternative to the curl webhook: the motion hook just pipes a single
+line into 'nc -u' (no TLS, no HTTP, no HA web stack) and we receive it on a
+datagram endpoint. The payload is
+
+    secret|event|camera_id|event_id|filetype|filename
+
+(filename last since it's the only field which could contain a '|'). The
+secret is a random key generated once and stored in the config entry so that
+stray/forged datagrams get dropped without needing any more configuration.
+"""
+
+import asyncio
+import hmac
+import secrets
+import typing
+
+from .helpers import LOGGER
+
+if typing.TYPE_CHECKING:
+    from . import MotionFrontendApi
+
+
+PAYLOAD_FIELDS = ("event", "camera_id", "event_id", "filetype", "filename")
+
+
+def udp_secret() -> str:
+    return secrets.token_hex(16)
+
+
+def udp_hookcommand(event: str, secret: str, host: str, port: int) -> str:
+    """the (already url encoded) motion on_* command"""
+    # plain echo (the trailing newline is stripped on receive) since
+    # 'echo -n' is not portable and printf would interpret '%' in the payload
+    return (
+        f"echo%20'{secret}|{event}|%t|%v|%n|%f'%20|%20"
+        f"nc%20-u%20-w1%20{host}%20{port}"
+    )
+
+
+class MotionEventProtocol(asyncio.DatagramProtocol):
+    __slots__ = (
+        "api",
+        "_secret",
+    )
+
+    def __init__(self, api: "MotionFrontendApi", secret: str):
+        self.api = api
+        self._secret = secret.encode()
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        fields = data.rstrip(b"\r\n").split(b"|", len(PAYLOAD_FIELDS))
+        if (len(fields) != len(PAYLOAD_FIELDS) + 1) or not hmac.compare_digest(
+            fields[0], self._secret
+        ):
+            LOGGER.debug("Dropped invalid udp event from %s", addr)
+            return
+        try:
+            event_data = {
+                key: value.decode()
+                for key, value in zip(PAYLOAD_FIELDS, fields[1:])
+                if value
+            }
+            LOGGER.debug("Received udp event - (%s)", event_data)
+            self.api.handle_event_data(event_data)
+        except Exception as exception:
+            LOGGER.error(
+                "udp event - %s(%s)",
+                exception.__class__.__name__,
+                str(exception),
+            )
+
+    def error_received(self, exc: Exception) -> None:
+        LOGGER.debug("udp event receiver error (%s)", str(exc))
+
+
+async def async_start_receiver(
+    api: "MotionFrontendApi", port: int, secret: str
+) -> asyncio.DatagramTransport:
+    transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+        lambda: MotionEventProtocol(api, secret), local_addr=("0.0.0.0", port)
+    )
+    return transport  # type: ignore
@@ -18,6 +18,8 @@ from unittest.mock import patch
 
 import pytest
 
+from custom_components.motion_frontend.motionclient import config_schema as cs
+
 pytest_plugins = "pytest_homeassistant_custom_component"
 
 
@@ -32,6 +34,29 @@ def skip_notifications_fixture():
         yield
 
 
+# This fixture provides a factory of 'config/list' worth of params (for any camera id)
+# as the motion client parser returns them: every call builds fresh (not interned) strings.
+@pytest.fixture(name="raw_config")
+def raw_config_fixture():
+    def _raw_config(camera_id: int) -> dict[str, str]:
+        config = {}
+        for key, descriptor in cs.SCHEMA.items():
+            if descriptor.builder is cs.BoolParam:
+                value = cs.VALUE_OFF
+            elif descriptor.builder is cs.IntParam:
+                value = "0"
+            elif descriptor.set:
+                value = str(sorted(descriptor.set, key=str)[0])
+            else:
+                value = "(not defined)"
+            config[key] = value
+        config[cs.CAMERA_ID] = str(camera_id)
+        config[cs.CAMERA_NAME] = f"camera {camera_id}"
+        return {"".join(key): "".join(value) for key, value in config.items()}
+
+    return _raw_config
+
+
 """
 # This fixture, when used, will result in calls to async_get_data to return None. To have the call
 # return a value, we would add the `return_value=<VALUE_TO_RETURN>` parameter to the patch call.
@@ -0,0 +1,35 @@
+"""Test the typed params factory memoization on a realistic config."""
+
+from collections import ChainMap
+
+from custom_components.motion_frontend.motionclient import config_schema as cs
+
+CAMERAS = 50
+ROUNDS = 10  # config refreshes
+
+
+def test_build_value_memoized(raw_config):
+    raw_configs = [raw_config(camera_id) for camera_id in range(CAMERAS + 1)]
+    pairs = {item for config in raw_configs for item in config.items()}
+    builds = ROUNDS * sum(len(config) for config in raw_configs)
+    assert len(pairs) <= cs.BUILD_CACHE_SIZE
+
+    cs._build_value_cached.cache_clear()
+    for _ in range(ROUNDS):
+        for config in raw_configs:
+            for key, value in config.items():
+                cs.build_value(key, value)
+    # every distinct (key, value) is built once: refreshes only hit the cache
+    cache_info = cs._build_value_cached.cache_info()
+    assert cache_info.misses == len(pairs)
+    assert cache_info.hits == builds - len(pairs)
+
+    assert cs.build_value(cs.STREAM_PORT, "8081") is cs.build_value(
+        cs.STREAM_PORT, "8081"
+    )
+    # True, 1 and "1" are different params
+    assert isinstance(cs.build_value(cs.STREAM_PORT, 1), cs.IntParam)
+    assert isinstance(cs.build_value(cs.STREAM_TLS, True), cs.BoolParam)
+    assert str(cs.build_value(cs.STREAM_TLS, True)) == cs.VALUE_ON
+    # flattened schema resolves as the former ChainMap
+    assert cs.SCHEMA == dict(ChainMap(*cs.SECTION_SET_MAP.values()))
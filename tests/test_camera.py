@@ -0,0 +1,85 @@
+"""Test the motion events handling in the camera entity."""
+
+import asyncio
+from unittest.mock import patch
+
+from custom_components.motion_frontend import MotionFrontendApi
+from custom_components.motion_frontend.camera import (
+    EVENT_DEDUP_WINDOW,
+    MotionFrontendCamera,
+)
+from custom_components.motion_frontend.const import (
+    ON_CAMERA_FOUND,
+    ON_CAMERA_LOST,
+    ON_EVENT_END,
+    ON_EVENT_START,
+    ON_MOTION_DETECTED,
+)
+from custom_components.motion_frontend.motionclient import config_schema as cs
+from custom_components.motion_frontend.motionclient.config_store import ConfigStore
+
+from .const import MOCK_CONFIG
+
+
+def _build_camera(hass, raw_config) -> MotionFrontendCamera:
+    api = MotionFrontendApi(hass, MOCK_CONFIG)  # type: ignore
+    global_config = ConfigStore(raw_config(0))
+    api._configs[cs.GLOBAL_ID] = global_config
+    api._configs["1"] = ConfigStore(raw_config(1), global_config)
+    camera = MotionFrontendCamera(api, "1")
+    camera.hass = hass
+    return camera
+
+
+def _event(event: str, event_id: str = "1", **data) -> dict:
+    return {"event": event, "camera_id": "1", "event_id": event_id} | data
+
+
+async def test_camera_event_start(hass, raw_config):
+    camera = _build_camera(hass, raw_config)
+    with (
+        patch.object(MotionFrontendCamera, "async_write_ha_state"),
+        patch.object(MotionFrontendCamera, "_get_image_fetch") as get_image_fetch,
+    ):
+        camera.handle_event(_event(ON_CAMERA_FOUND))
+        await asyncio.sleep(0)  # applied at the next loop iteration
+        assert camera.connected
+
+        camera.handle_event(_event(ON_EVENT_START))
+        # rising edge: triggered right away (and the snapshot prefetched)
+        assert camera.is_triggered
+        get_image_fetch.assert_called_once()
+        await asyncio.sleep(0)  # flush the (patched) state write
+
+
+async def test_camera_event_dedup(hass, raw_config):
+    camera = _build_camera(hass, raw_config)
+    with (
+        patch.object(MotionFrontendCamera, "async_write_ha_state"),
+        patch("custom_components.motion_frontend.camera.monotonic") as monotonic,
+    ):
+        monotonic.return_value = 1000.0
+        camera.handle_event(_event(ON_EVENT_START))
+        assert camera.is_triggered
+        camera.handle_event(_event(ON_EVENT_START))  # i.e. a curl retry
+        assert camera.events_dropped == 1
+
+        # connection events are never dropped (just folded in the final state)
+        camera.handle_event(_event(ON_CAMERA_LOST))
+        camera.handle_event(_event(ON_CAMERA_FOUND))
+        camera.handle_event(_event(ON_CAMERA_LOST))
+        # a burst ending in motion again: the camera stays triggered
+        camera.handle_event(_event(ON_EVENT_END))
+        camera.handle_event(_event(ON_MOTION_DETECTED))
+        assert camera.events_dropped == 1
+        assert camera.events_merged == 3
+        await asyncio.sleep(0)
+        assert camera.is_triggered
+        assert not camera.connected
+
+        # past the window the same event is processed again
+        monotonic.return_value += EVENT_DEDUP_WINDOW
+        camera.handle_event(_event(ON_EVENT_START))
+        assert camera.events_dropped == 1
+        assert camera.events_received == 8
+        await asyncio.sleep(0)
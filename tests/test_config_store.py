@@ -0,0 +1,73 @@
+"""Benchmark the memory used by the parsed motion configs."""
+
+import tracemalloc
+
+from custom_components.motion_frontend.motionclient import config_schema as cs
+from custom_components.motion_frontend.motionclient.config_store import ConfigStore
+
+CAMERAS = 50
+MEMORY_BUDGET = 2048  # bytes per config (camera configs only store overrides)
+
+
+def test_config_store_memory(raw_config):
+    raw_configs = [raw_config(camera_id) for camera_id in range(CAMERAS + 1)]
+
+    tracemalloc.start()
+    try:
+        global_config = ConfigStore(raw_configs[0])
+        configs = [global_config] + [
+            ConfigStore(raw_config, global_config) for raw_config in raw_configs[1:]
+        ]
+        used, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert used / len(configs) < MEMORY_BUDGET
+
+    config = configs[CAMERAS]
+    # camera only params are the only ones stored
+    assert config.overrides == len(cs.CAMERACONFIG_SET & raw_configs[CAMERAS].keys())
+    # global only params are read from the global config
+    assert len(config) == len(raw_configs[CAMERAS])
+    assert config[cs.CAMERA_NAME] == f"camera {CAMERAS}"
+    assert config[cs.CAMERA_ID] == CAMERAS
+    assert str(config[cs.CAMERA_ID]) == str(CAMERAS)
+    assert config[cs.STREAM_TLS] is not None and not config[cs.STREAM_TLS]
+    assert config[cs.TARGET_DIR] is None
+    assert config.descriptor(cs.STREAM_PORT) is cs.SCHEMA[cs.STREAM_PORT]
+
+    config[cs.STREAM_TLS] = cs.build_value(cs.STREAM_TLS, True)
+    assert config[cs.STREAM_TLS]
+    assert config.raw(cs.STREAM_TLS) == cs.VALUE_ON
+
+
+def test_config_store_overlay(raw_config):
+    global_config = ConfigStore(raw_config(0))
+    camera_raw_config = raw_config(1)
+    camera_raw_config[cs.STREAM_PORT] = "8082"
+    camera_config = ConfigStore(camera_raw_config, global_config)
+    other_config = ConfigStore(raw_config(2), global_config)
+    camera_only = len(cs.CAMERACONFIG_SET & camera_raw_config.keys())
+
+    assert camera_config[cs.STREAM_PORT] == 8082
+    assert other_config[cs.STREAM_PORT] == 0
+    # global only params are never stored in the camera config
+    camera_config[cs.WEBCONTROL_TLS] = cs.build_value(cs.WEBCONTROL_TLS, True)
+    assert not camera_config[cs.WEBCONTROL_TLS]
+    assert camera_config.overrides == camera_only + 1
+
+    # a global set applies to every camera dropping their overrides
+    global_config[cs.STREAM_PORT] = cs.build_value(cs.STREAM_PORT, "8090")
+    assert camera_config[cs.STREAM_PORT] == 8090
+    assert other_config[cs.STREAM_PORT] == 8090
+    assert camera_config.overrides == camera_only
+    # camera only params are never inherited (nor overwritten)
+    global_config[cs.CAMERA_NAME] = cs.build_value(cs.CAMERA_NAME, "global")
+    assert camera_config[cs.CAMERA_NAME] == "camera 1"
+
+    # setting the global value back on a camera drops the override
+    camera_config[cs.THRESHOLD] = cs.build_value(cs.THRESHOLD, "1500")
+    assert camera_config.overrides == camera_only + 1
+    assert global_config[cs.THRESHOLD] == 0
+    camera_config[cs.THRESHOLD] = cs.build_value(cs.THRESHOLD, "0")
+    assert camera_config.overrides == camera_only
@@ -0,0 +1,40 @@
+"""Benchmark the integration import time."""
+
+from pathlib import Path
+import subprocess
+import sys
+
+PACKAGE = "custom_components.motion_frontend"
+MODULES = (PACKAGE, f"{PACKAGE}.config_flow")
+IMPORT_BUDGET = 0.05  # seconds spent in our own module bodies
+
+
+def _own_import_time(module: str) -> tuple[float, set[str]]:
+    """(self time of our modules, all of the imported modules) importing module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        name = name.strip()
+        imported.add(name)
+        if name.startswith(PACKAGE):
+            elapsed += int(self_us)
+    return elapsed / 1000000, imported
+
+
+def test_import_time_budget():
+    for module in MODULES:
+        elapsed, imported = _own_import_time(module)
+        assert elapsed < IMPORT_BUDGET, f"{module}: {elapsed:.3f} s"
+        # only needed by the platforms/features using them
+        assert f"{PACKAGE}.alarm_control_panel" not in imported
+        assert f"{PACKAGE}.media_index" not in imported
@@ -0,0 +1,81 @@
+"""Test (and benchmark) the motion events webhook."""
+
+import time
+from unittest.mock import MagicMock, patch
+
+from homeassistant.components import webhook
+from homeassistant.setup import async_setup_component
+
+from custom_components.motion_frontend import MotionFrontendApi
+from custom_components.motion_frontend.const import DOMAIN
+
+from .const import MOCK_CONFIG
+
+EVENTS = 2000
+CPU_BUDGET = 0.0005  # seconds per event (ingestion only, the camera is a stub)
+WEBHOOK_ID = f"{DOMAIN}_test"
+MEDIA_DIR_ID = f"{DOMAIN}_test"
+EVENT = {
+    "event": "on_movie_end",
+    "camera_id": "1",
+    "event_id": "42",
+    "filename": "/var/lib/motion/cam1/01-20240101120000.mkv",
+    "filetype": "8",
+}
+
+
+async def test_webhook_events(hass, hass_client_no_auth):
+    assert await async_setup_component(hass, "webhook", {})
+
+    api = MotionFrontendApi(hass, MOCK_CONFIG)  # type: ignore
+    api.media_dir_id = MEDIA_DIR_ID
+    api.target_dir_prefix = "/var/lib/motion/"
+    api.media_dir_prefix = f"{MEDIA_DIR_ID}/"
+    webhook.async_register(hass, DOMAIN, DOMAIN, WEBHOOK_ID, api.async_handle_webhook)
+    client = await hass_client_no_auth()
+    url = webhook.async_generate_path(WEBHOOK_ID)
+    camera = MagicMock(id="1")
+
+    with patch.object(api, "getcamera", return_value=camera) as getcamera:
+        # our hooks send everything in the query string
+        response = await client.post(url, params=EVENT)
+        assert response.status == 200
+        # hooks installed by older versions post a form
+        response = await client.post(url, data=EVENT | {"event": "on_event_end"})
+        assert response.status == 200
+
+    getcamera.assert_called_with("1")
+    filename = f"{MEDIA_DIR_ID}/cam1/01-20240101120000.mkv"
+    assert [call.args[0] for call in camera.handle_event.call_args_list] == [
+        EVENT | {"filename": filename},
+        EVENT | {"event": "on_event_end", "filename": filename},
+    ]
+
+    webhook.async_unregister(hass, WEBHOOK_ID)
+
+
+class _Camera:
+    id = "1"
+
+    def __init__(self):
+        self.events = []
+
+    def handle_event(self, data: dict):
+        self.events.append(data)
+
+
+async def test_webhook_events_cpu_budget(hass):
+    api = MotionFrontendApi(hass, MOCK_CONFIG)  # type: ignore
+    api.media_dir_id = MEDIA_DIR_ID
+    api.target_dir_prefix = "/var/lib/motion/"
+    api.media_dir_prefix = f"{MEDIA_DIR_ID}/"
+    camera = _Camera()
+
+    with patch.object(api, "getcamera", return_value=camera):
+        start = time.process_time()
+        for _ in range(EVENTS):
+            api.handle_event_data(dict(EVENT))
+        elapsed = time.process_time() - start
+
+    assert len(camera.events) == EVENTS
+    assert elapsed / EVENTS < CPU_BUDGET